@@ -38,6 +38,33 @@ else:
     print(f"Superuser '{username}' already exists.")
 EOF
 
-python manage.py rqworker default &
+# One worker per stage, so posters and the first playable rendition of an
+# upload never wait behind long encodes; RQ_HEAVY_WORKERS sets how many
+# workers encode the remaining resolutions in parallel
+python manage.py rqworker thumbnails default &
+python manage.py rqworker fast-renditions &
+i=0
+while [ "$i" -lt "${RQ_HEAVY_WORKERS:-1}" ]; do
+  python manage.py rqworker heavy-renditions &
+  i=$((i + 1))
+done
+
+# Conversions a crashed worker left behind are resumed once their heartbeat
+# is stale (RENDITION_STALE_AFTER = 120 s); checked periodically, so workers
+# dying while the container keeps running are covered too
+(
+  while true; do
+    sleep "${RESUME_CONVERSIONS_INTERVAL:-150}"
+    python manage.py resume_conversions || echo "resume_conversions fehlgeschlagen"
+  done
+) &
 
-exec gunicorn core.wsgi:application --bind 0.0.0.0:8000 --reload
+# ASYNC_CATALOG_VIEWS=True: ASGI worker so the async catalog views run on an event loop
+case "$ASYNC_CATALOG_VIEWS" in
+  [Tt]rue)
+    exec gunicorn core.asgi:application --bind 0.0.0.0:8000 --reload -k uvicorn_worker.UvicornWorker
+    ;;
+  *)
+    exec gunicorn core.wsgi:application --bind 0.0.0.0:8000 --reload
+    ;;
+esac
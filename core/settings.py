@@ -59,6 +59,7 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'videos.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,6 +68,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Serve the read-only catalog endpoints from async views (videos/async_views.py).
+# Meant for ASGI workers, see backend.entrypoint.sh. WhiteNoise has no async
+# support and would move every request onto a thread, so it is skipped here;
+# static files are served by the front proxy in that setup.
+ASYNC_CATALOG_VIEWS = os.getenv('ASYNC_CATALOG_VIEWS', 'False').lower() == 'true'
+if ASYNC_CATALOG_VIEWS:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -112,15 +121,35 @@ CACHES = {
     }
 }
 
+# 'single-pass' decodes each upload once and encodes all renditions from it
+# (one FFmpeg process, one job); 'per-rendition' enqueues one job per
+# resolution so several workers encode an upload in parallel; 'chunked'
+# cuts the upload at keyframes and encodes the pieces in parallel processes
+# within one job (VIDEO_CHUNK_WORKERS at a time, default: one per CPU)
+VIDEO_TRANSCODE_MODE = os.getenv('VIDEO_TRANSCODE_MODE', 'single-pass')
+VIDEO_CHUNK_WORKERS = int(os.getenv('VIDEO_CHUNK_WORKERS', 0)) or os.cpu_count()
+# Job timeout of chunked conversions; queues allowing longer (heavy-renditions) keep their own
+VIDEO_CHUNKED_JOB_TIMEOUT = int(os.getenv('VIDEO_CHUNKED_JOB_TIMEOUT', 3 * 60 * 60))
+
+RQ_CONNECTION = {
+    'HOST': os.environ.get("REDIS_HOST", default="redis"),
+    'PORT': os.environ.get("REDIS_PORT", default=6379),
+    'DB': os.environ.get("REDIS_DB", default=0),
+    'PASSWORD': os.environ.get("REDIS_PASSWORD", default=None),
+    'REDIS_CLIENT_KWARGS': {},
+}
+
+# Video processing is split over dedicated queues (each with its own workers,
+# see backend.entrypoint.sh), so a long upload never delays the posters and
+# first playable rendition of other uploads
 RQ_QUEUES = {
-    'default': {
-        'HOST': os.environ.get("REDIS_HOST", default="redis"),
-        'PORT': os.environ.get("REDIS_PORT", default=6379),
-        'DB': os.environ.get("REDIS_DB", default=0),
-        'PASSWORD': os.environ.get("REDIS_PASSWORD", default=None),
-        'DEFAULT_TIMEOUT': 900,
-        'REDIS_CLIENT_KWARGS': {},
-    },
+    'default': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 900},
+    # Probing, thumbnail and preview image of each upload
+    'thumbnails': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 900},
+    # Lowest resolution of each upload
+    'fast-renditions': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 60 * 60},
+    # All other resolutions
+    'heavy-renditions': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 6 * 60 * 60},
 }
 
 
@@ -164,6 +193,30 @@ STATIC_ROOT = BASE_DIR / "static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# How media files are delivered after Django checked the request:
+# 'django' streams them in-process, 'x-accel-redirect' hands the transfer to
+# nginx (internal location at MEDIA_ACCEL_REDIRECT_PREFIX) and 'x-sendfile'
+# to Apache mod_xsendfile / lighttpd.
+MEDIA_DELIVERY_MODE = os.getenv('MEDIA_DELIVERY_MODE', 'django')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# API responses smaller than this (bytes) are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+
+# Signed media URLs: when enabled, the playback endpoints emit short-lived
+# HMAC-signed URLs and unsigned requests for video files are refused.
+MEDIA_SIGNED_URLS = os.getenv('MEDIA_SIGNED_URLS', 'False').lower() == 'true'
+MEDIA_SIGNED_URL_TTL = int(os.getenv('MEDIA_SIGNED_URL_TTL', 6 * 60 * 60))
+# Unset or empty: SECRET_KEY signs the URLs
+MEDIA_SIGNING_KEY = os.getenv('MEDIA_SIGNING_KEY') or SECRET_KEY
+
+# Per-process LRU cache for HLS segments and playlists served in-process
+# ('django' delivery mode). A budget of 0 disables it.
+MEDIA_CACHE_MAX_BYTES = int(os.getenv('MEDIA_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+MEDIA_CACHE_MAX_ENTRY_BYTES = int(os.getenv('MEDIA_CACHE_MAX_ENTRY_BYTES', 8 * 1024 * 1024))
+# Seconds between hit rate log lines of each process, 0 disables them
+MEDIA_CACHE_STATS_INTERVAL = int(os.getenv('MEDIA_CACHE_STATS_INTERVAL', 300))
+
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Default primary key field type
@@ -182,9 +235,28 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # orjson-backed JSON, falls back to DRF's stdlib renderer/parser without orjson
+    'DEFAULT_RENDERER_CLASSES': [
+        'videos.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'videos.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'videos.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': int(os.getenv('CATALOG_PAGE_SIZE', 24)),
 }
 
+# Upper bound for the ?page_size= clients may request on catalog endpoints
+CATALOG_MAX_PAGE_SIZE = int(os.getenv('CATALOG_MAX_PAGE_SIZE', 100))
+
+# Rendered catalog responses are cached per catalog version (see videos/cache.py)
+CATALOG_RESPONSE_CACHE_ENABLED = os.getenv('CATALOG_RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+CATALOG_RESPONSE_CACHE_TIMEOUT = int(os.getenv('CATALOG_RESPONSE_CACHE_TIMEOUT', 60 * 60))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
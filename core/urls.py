@@ -17,9 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include, re_path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from django.conf import settings
-from django.conf.urls.static import static
-from django.views.static import serve
+from videos.media import serve_media, serve_signed_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -31,13 +29,9 @@ urlpatterns = [
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
 ]
 
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-else:
-    # In production, serve media files through Django's serve view
-    urlpatterns += [
-        re_path(r'^media/(?P<path>.*)$', serve, {
-            'document_root': settings.MEDIA_ROOT,
-        }),
-    ]
+# Media files are checked by Django and, depending on MEDIA_DELIVERY_MODE,
+# streamed in-process or handed to the front proxy
+urlpatterns += [
+    re_path(r'^media/signed/(?P<expires>[0-9]+)/(?P<signature>[\w-]+)/(?P<path>.*)$', serve_signed_media),
+    re_path(r'^media/(?P<path>.*)$', serve_media),
+]
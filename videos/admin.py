@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Genre, Video, VideoFile
+from .models import Genre, RenditionState, Video, VideoFile
 
 @admin.register(Genre)
 class GenreAdmin(admin.ModelAdmin):
@@ -63,3 +63,10 @@ class VideoFileAdmin(admin.ModelAdmin):
         return '-'
     file_size_display.short_description = 'File Size'
 
+
+@admin.register(RenditionState)
+class RenditionStateAdmin(admin.ModelAdmin):
+    list_display = ('video', 'resolution', 'status', 'attempts', 'heartbeat_at', 'updated_at')
+    list_filter = ('status', 'resolution')
+    search_fields = ('video__title',)
+    readonly_fields = ('attempts', 'heartbeat_at', 'updated_at')
@@ -0,0 +1,15 @@
+"""
+Routes of the async catalog views, included in front of the DRF router
+when ASYNC_CATALOG_VIEWS is enabled.
+"""
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('genres/', async_views.genre_list),
+    path('genres/<int:pk>/', async_views.genre_detail),
+    path('videos/', async_views.video_list),
+    path('videos/<int:pk>/', async_views.video_detail),
+    path('videos/by_genre/', async_views.videos_by_genre),
+    path('videos/<int:pk>/playback/', async_views.video_playback),
+]
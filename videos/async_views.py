@@ -0,0 +1,150 @@
+"""
+Async (ASGI) versions of the read-only catalog endpoints.
+
+They are routed in front of the DRF viewsets when ASYNC_CATALOG_VIEWS is
+enabled (see async_urls.py), so an ASGI worker can keep many requests
+waiting on the cache or database without blocking a thread per request.
+
+- Access tokens are validated statelessly; no user query is issued. An
+  inactive user keeps access to the catalog until the access token expires.
+- Catalog validators and rendered responses are read through the async
+  cache API, so ETag revalidations and cache hits never enter sync code.
+- by_genre and playback load their data through the async ORM; by_genre
+  stores its rendered response in the same cache as the DRF view.
+- Cache misses on the paginated list/detail endpoints are handed to the DRF
+  viewsets, which fill the cache for the next request.
+"""
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from .cache import aget_cached_response, aget_catalog_validators, astore_response, make_response_cache_key
+from .constants import BY_GENRE_VIDEO_LIMIT, MASTER_PLAYLIST_RESOLUTION
+from .decorators import catalog_etag, catalog_last_modified
+from .models import Video
+from .playback import aget_playback_manifest, build_playback_response
+from .renderers import FastJSONRenderer
+from .serializers import VideoListSerializer, group_videos_by_genre
+from .views import GenreViewSet, VideoViewSet
+
+authenticator = JWTStatelessUserAuthentication()
+
+
+def json_response(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def authenticated(view):
+    """Require a valid access token on a GET/HEAD-only async view"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+        try:
+            result = authenticator.authenticate(request)
+            if result is None:
+                raise NotAuthenticated()
+        except (InvalidToken, AuthenticationFailed, NotAuthenticated) as exc:
+            response = json_response({'detail': exc.detail}, status=401)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+
+        request.user = result[0]
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def catalog_endpoint(view):
+    """
+    Async counterpart of catalog_conditional: authentication plus catalog
+    ETag / Last-Modified, with the validators fetched from the async cache.
+    """
+    conditional_view = cache_control(private=True, no_cache=True)(
+        condition(catalog_etag, catalog_last_modified)(view)
+    )
+
+    @authenticated
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # Picked up by catalog_etag / catalog_last_modified and by the DRF fallback
+        request._catalog_validators = await aget_catalog_validators()
+        return await conditional_view(request, *args, **kwargs)
+    return wrapper
+
+
+def cached_viewset_view(viewset_class, actions):
+    """
+    Serve a DRF viewset action from the response cache, calling the viewset on a miss.
+
+    Args:
+        viewset_class: Viewset whose list/retrieve methods use cached_catalog_response
+        actions: Method to action mapping, as for ViewSet.as_view()
+    """
+    drf_view = sync_to_async(viewset_class.as_view(actions))
+
+    @catalog_endpoint
+    async def view(request, *args, **kwargs):
+        if settings.CATALOG_RESPONSE_CACHE_ENABLED and _wants_json(request):
+            version, _ = request._catalog_validators
+            key = make_response_cache_key(request.build_absolute_uri(request.path), request.GET, 'json', version)
+            cached = await aget_cached_response(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response.compression_cache_key = key
+                return response
+
+        return await drf_view(request, *args, **kwargs)
+    return view
+
+
+video_list = cached_viewset_view(VideoViewSet, {'get': 'list'})
+video_detail = cached_viewset_view(VideoViewSet, {'get': 'retrieve'})
+genre_list = cached_viewset_view(GenreViewSet, {'get': 'list'})
+genre_detail = cached_viewset_view(GenreViewSet, {'get': 'retrieve'})
+
+
+@catalog_endpoint
+async def videos_by_genre(request):
+    """Async VideoViewSet.by_genre"""
+    version, _ = request._catalog_validators
+    key = make_response_cache_key(request.build_absolute_uri(request.path), request.GET, 'json', version)
+    if settings.CATALOG_RESPONSE_CACHE_ENABLED:
+        cached = await aget_cached_response(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response.compression_cache_key = key
+            return response
+
+    videos = [
+        video async for video in Video.objects.top_per_genre(BY_GENRE_VIDEO_LIMIT).with_api_relations()
+    ]
+    payload = group_videos_by_genre(VideoListSerializer(videos, many=True, context={'request': request}).data)
+    response = json_response(payload)
+    if settings.CATALOG_RESPONSE_CACHE_ENABLED:
+        await astore_response(key, response.content, response['Content-Type'])
+    response.compression_cache_key = key
+    return response
+
+
+@authenticated
+async def video_playback(request, pk):
+    """Async VideoViewSet.playback"""
+    manifest = await aget_playback_manifest(pk)
+    if manifest is None:
+        return json_response({'detail': 'No Video matches the given query.'}, status=404)
+
+    resolution = request.GET.get('resolution', MASTER_PLAYLIST_RESOLUTION)
+    return json_response(build_playback_response(manifest, resolution))
+
+
+def _wants_json(request):
+    """Whether DRF's content negotiation would pick the JSON renderer"""
+    return 'format' not in request.GET and 'text/html' not in request.headers.get('Accept', '')
@@ -0,0 +1,326 @@
+"""
+Cache helpers for catalog payloads served by the video API.
+Entries are dropped by the signal handlers in signals.py whenever the catalog
+changes. Rendered responses are keyed by the catalog version instead, so the
+version bump alone retires them without scanning keys.
+
+The featured pool is a Redis set of video IDs so a random pick is a single
+SRANDMEMBER. Cache backends without a raw Redis client fall back to storing
+the pool as a plain cached set.
+"""
+import hashlib
+import random
+import time
+from datetime import datetime, timezone as dt_timezone
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django_redis import get_redis_connection
+from .constants import (
+    CATALOG_VERSION_CACHE_KEY,
+    CATALOG_MODIFIED_CACHE_KEY,
+    FEATURED_POOL_CACHE_KEY,
+    FEATURED_PAYLOAD_CACHE_KEY,
+    FEATURED_PAYLOAD_CACHE_TIMEOUT,
+    FEATURED_PICK_ATTEMPTS,
+    RESPONSE_CACHE_KEY_PREFIX,
+    RESPONSE_CACHE_HITS_KEY,
+    RESPONSE_CACHE_MISSES_KEY
+)
+from .signing import signing_window, signing_window_start
+
+
+def get_catalog_validators():
+    """
+    Return the current catalog version and last modification time.
+    
+    With MEDIA_SIGNED_URLS on, catalog responses carry signed URLs, so both
+    also move on with the signing window: a new window changes the ETag, the
+    response cache key and Last-Modified, and nobody keeps URLs signed in an
+    earlier window.
+    
+    Returns:
+        tuple: (version, last_modified datetime)
+    """
+    values = cache.get_many([CATALOG_VERSION_CACHE_KEY, CATALOG_MODIFIED_CACHE_KEY])
+    version = values.get(CATALOG_VERSION_CACHE_KEY)
+    last_modified = values.get(CATALOG_MODIFIED_CACHE_KEY)
+    
+    if version is None:
+        version = _init_catalog_version()
+    if last_modified is None:
+        # Unknown after a cache flush, so assume the catalog just changed
+        cache.add(CATALOG_MODIFIED_CACHE_KEY, timezone.now(), None)
+        last_modified = cache.get(CATALOG_MODIFIED_CACHE_KEY)
+    return _in_signing_window(version, last_modified)
+
+
+async def aget_catalog_validators():
+    """Async get_catalog_validators(), one cache round trip when both values are set"""
+    values = await cache.aget_many([CATALOG_VERSION_CACHE_KEY, CATALOG_MODIFIED_CACHE_KEY])
+    if len(values) == 2:
+        return _in_signing_window(values[CATALOG_VERSION_CACHE_KEY], values[CATALOG_MODIFIED_CACHE_KEY])
+    return await sync_to_async(get_catalog_validators)()
+
+
+def _in_signing_window(version, last_modified):
+    """Extend catalog validators by the current signing window, see get_catalog_validators()"""
+    window = signing_window()
+    if window is None:
+        return version, last_modified
+    window_start = datetime.fromtimestamp(signing_window_start(window), tz=dt_timezone.utc)
+    return f'{version}.{window}', max(last_modified, window_start)
+
+
+def bump_catalog_version():
+    """Mark the catalog as changed"""
+    try:
+        cache.incr(CATALOG_VERSION_CACHE_KEY)
+    except ValueError:
+        _init_catalog_version()
+    cache.set(CATALOG_MODIFIED_CACHE_KEY, timezone.now(), None)
+
+
+def invalidate_catalog_cache():
+    """Bump the catalog version and remove all cached catalog payloads"""
+    bump_catalog_version()
+    cache.delete_many([
+        FEATURED_PAYLOAD_CACHE_KEY.format(video_id=video_id)
+        for video_id in _get_featured_ids()
+    ])
+
+
+def build_response_cache_key(request, version):
+    """
+    Build the cache key for a rendered response.
+    
+    The key covers the absolute URL (host and path, since rendered links are
+    absolute), the sorted query parameters, the response format and the
+    catalog version, so a catalog change makes every older entry unreachable.
+    
+    Args:
+        request: DRF request
+        version: Current catalog version
+        
+    Returns:
+        str: Cache key
+    """
+    return make_response_cache_key(
+        request.build_absolute_uri(request.path),
+        request.query_params,
+        request.accepted_renderer.format,
+        version
+    )
+
+
+def make_response_cache_key(url, query_params, renderer_format, version):
+    """Build a response cache key from its parts, see build_response_cache_key()"""
+    query = sorted(
+        (name, sorted(values))
+        for name, values in query_params.lists()
+        if any(values)
+    )
+    fingerprint = f'{url}|{query}|{renderer_format}'
+    digest = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+    return f'{RESPONSE_CACHE_KEY_PREFIX}:{version}:{digest}'
+
+
+def get_cached_response(key):
+    """
+    Return the cached (content, content_type) for a key and count the hit or miss.
+    
+    Returns:
+        tuple: (bytes, str) or None on a miss
+    """
+    cached = cache.get(key)
+    _increment(RESPONSE_CACHE_HITS_KEY if cached is not None else RESPONSE_CACHE_MISSES_KEY)
+    return cached
+
+
+async def aget_cached_response(key):
+    """
+    Async lookup of a rendered response, counting hits only.
+    
+    Misses are passed on to the sync view, whose lookup counts them.
+    
+    Returns:
+        tuple: (bytes, str) or None on a miss
+    """
+    cached = await cache.aget(key)
+    if cached is not None:
+        await _aincrement(RESPONSE_CACHE_HITS_KEY)
+    return cached
+
+
+def store_response(key, content, content_type):
+    """Store rendered response bytes under a key"""
+    cache.set(key, (content, content_type), settings.CATALOG_RESPONSE_CACHE_TIMEOUT)
+
+
+async def astore_response(key, content, content_type):
+    await cache.aset(key, (content, content_type), settings.CATALOG_RESPONSE_CACHE_TIMEOUT)
+
+
+def get_compressed_response(key, encoding):
+    """Return the cached compressed body of a cached response, or None"""
+    return cache.get(f'{key}:{encoding}')
+
+
+async def aget_compressed_response(key, encoding):
+    return await cache.aget(f'{key}:{encoding}')
+
+
+def store_compressed_response(key, encoding, content):
+    """Cache the compressed body of a response next to its rendered bytes"""
+    cache.set(f'{key}:{encoding}', content, settings.CATALOG_RESPONSE_CACHE_TIMEOUT)
+
+
+async def astore_compressed_response(key, encoding, content):
+    await cache.aset(f'{key}:{encoding}', content, settings.CATALOG_RESPONSE_CACHE_TIMEOUT)
+
+
+def get_response_cache_stats():
+    """
+    Return hit/miss counters of the response cache.
+    
+    Returns:
+        dict: hits, misses and hit_rate
+    """
+    values = cache.get_many([RESPONSE_CACHE_HITS_KEY, RESPONSE_CACHE_MISSES_KEY])
+    hits = values.get(RESPONSE_CACHE_HITS_KEY, 0)
+    misses = values.get(RESPONSE_CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0
+    }
+
+
+def sync_featured_video(video_id, is_featured):
+    """
+    Add or remove a video from the featured pool.
+    
+    Args:
+        video_id: ID of the video
+        is_featured: Whether the video should be part of the pool
+    """
+    redis = _get_redis_connection()
+    if redis is not None:
+        key = cache.make_key(FEATURED_POOL_CACHE_KEY)
+        if is_featured:
+            redis.sadd(key, video_id)
+        else:
+            redis.srem(key, video_id)
+        return
+    
+    featured_ids = cache.get(FEATURED_POOL_CACHE_KEY, set())
+    if is_featured:
+        featured_ids.add(video_id)
+    else:
+        featured_ids.discard(video_id)
+    cache.set(FEATURED_POOL_CACHE_KEY, featured_ids, None)
+
+
+def get_random_featured_payload(serialize):
+    """
+    Pick a random featured video from the pool and return its detail payload.
+    
+    Args:
+        serialize: Callable turning a Video instance into its payload
+        
+    Returns:
+        dict: Serialized video, or None if no featured video exists
+    """
+    from .models import Video
+    
+    for _ in range(FEATURED_PICK_ATTEMPTS):
+        video_id = _pick_featured_id()
+        if video_id is None:
+            return None
+        
+        key = FEATURED_PAYLOAD_CACHE_KEY.format(video_id=video_id)
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+        
+        video = Video.objects.with_api_relations().filter(pk=video_id, is_featured=True).first()
+        if video is None:
+            # The pool is ahead of the database, e.g. after a bulk update
+            sync_featured_video(video_id, False)
+            continue
+        
+        payload = serialize(video)
+        cache.set(key, payload, FEATURED_PAYLOAD_CACHE_TIMEOUT)
+        return payload
+    
+    return None
+
+
+def _pick_featured_id():
+    """Return a random ID from the featured pool, rebuilding the pool if it is empty"""
+    video_id = _random_featured_id()
+    if video_id is None and _rebuild_featured_pool():
+        video_id = _random_featured_id()
+    return video_id
+
+
+def _random_featured_id():
+    redis = _get_redis_connection()
+    if redis is not None:
+        member = redis.srandmember(cache.make_key(FEATURED_POOL_CACHE_KEY))
+        return int(member) if member is not None else None
+    
+    featured_ids = cache.get(FEATURED_POOL_CACHE_KEY)
+    return random.choice(tuple(featured_ids)) if featured_ids else None
+
+
+def _rebuild_featured_pool():
+    """Load featured IDs from the database into the pool, returns True if any exist"""
+    from .models import Video
+    
+    featured_ids = list(Video.objects.filter(is_featured=True).values_list('id', flat=True))
+    for video_id in featured_ids:
+        sync_featured_video(video_id, True)
+    return bool(featured_ids)
+
+
+def _get_featured_ids():
+    redis = _get_redis_connection()
+    if redis is not None:
+        return [int(member) for member in redis.smembers(cache.make_key(FEATURED_POOL_CACHE_KEY))]
+    return list(cache.get(FEATURED_POOL_CACHE_KEY, set()))
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+async def _aincrement(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            await cache.aincr(key)
+
+
+def _init_catalog_version():
+    """
+    Start the version counter from the current time, so a flushed cache never
+    hands out a version (and ETag) that was already used for older data.
+    """
+    cache.add(CATALOG_VERSION_CACHE_KEY, time.time_ns() // 1000, None)
+    return cache.get(CATALOG_VERSION_CACHE_KEY)
+
+
+def _get_redis_connection():
+    """Return the raw Redis client behind the default cache, or None for other backends"""
+    try:
+        return get_redis_connection('default')
+    except NotImplementedError:
+        return None
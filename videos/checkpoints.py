@@ -0,0 +1,171 @@
+"""
+Checkpoints that let HLS conversion resume after a worker crash.
+
+Every rendition of an upload has a RenditionState. A job claims the
+renditions it is about to encode, keeps their heartbeat fresh while FFmpeg
+runs and records done or failed afterwards. If the worker dies mid-encode,
+its renditions stay 'running' but their heartbeat goes stale. The next job
+for the upload (see the resume_conversions command) claims them again; the
+caller discards their partial output before re-encoding. Finished
+renditions are never claimed again, so only unfinished work is redone.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from .constants import RENDITION_HEARTBEAT_INTERVAL, RENDITION_STALE_AFTER
+from .models import RenditionState
+
+logger = logging.getLogger(__name__)
+
+
+def register_renditions(video, resolutions):
+    """Create pending states for the renditions of a video that have none yet"""
+    RenditionState.objects.bulk_create(
+        [RenditionState(video=video, resolution=resolution) for resolution in resolutions],
+        ignore_conflicts=True
+    )
+
+
+def claim_renditions(video, resolutions):
+    """
+    Mark renditions as running unless a live job is already encoding them.
+
+    Args:
+        video: Video instance
+        resolutions: Resolution names the caller found missing
+
+    Returns:
+        list: The claimed resolutions, in the given order
+    """
+    register_renditions(video, resolutions)
+    now = timezone.now()
+    claimed = []
+
+    for resolution in resolutions:
+        updated = RenditionState.objects.filter(
+            video=video, resolution=resolution
+        ).exclude(status=RenditionState.DONE).exclude(_live_filter(now)).update(
+            status=RenditionState.RUNNING,
+            attempts=F('attempts') + 1,
+            heartbeat_at=now,
+            error='',
+            updated_at=now
+        )
+        if updated:
+            claimed.append(resolution)
+        else:
+            logger.info(f"{resolution} of {video.title} is finished or being converted by another job, skipping...")
+
+    return claimed
+
+
+def mark_renditions(video, resolutions, status, error=''):
+    """Record the outcome of claimed renditions"""
+    RenditionState.objects.filter(video=video, resolution__in=resolutions).update(
+        status=status,
+        error=error,
+        updated_at=timezone.now()
+    )
+
+
+@contextmanager
+def checkpointed(video, resolutions):
+    """
+    Claim renditions for the duration of a with block.
+
+    A background thread refreshes their heartbeat while the block runs.
+    Claimed renditions the block did not mark done are marked failed on exit.
+
+    Args:
+        video: Video instance
+        resolutions: Resolution names the caller found missing
+
+    Yields:
+        list: The claimed resolutions
+    """
+    claimed = claim_renditions(video, resolutions)
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_send_heartbeats, args=(video.pk, claimed, stop), daemon=True)
+    if claimed:
+        heartbeat.start()
+
+    error = 'Conversion failed'
+    try:
+        yield claimed
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        stop.set()
+        if claimed:
+            heartbeat.join()
+        RenditionState.objects.filter(
+            video=video, resolution__in=claimed, status=RenditionState.RUNNING
+        ).update(status=RenditionState.FAILED, error=error, updated_at=timezone.now())
+
+
+def find_resumable_videos(include_failed=False, now=None):
+    """
+    Find videos with renditions abandoned by a crashed worker.
+
+    Args:
+        include_failed: Also include renditions whose conversion failed
+        now: Reference time for the staleness check
+
+    Returns:
+        list: Video IDs
+    """
+    return list(
+        RenditionState.objects.filter(
+            _resumable_filter(include_failed, now or timezone.now())
+        ).values_list('video_id', flat=True).distinct().order_by('video_id')
+    )
+
+
+def requeue_renditions(video_ids, include_failed=False, now=None):
+    """
+    Mark the abandoned renditions of videos pending again.
+
+    Called once their conversion is re-enqueued, so a periodic
+    resume_conversions run does not enqueue them again while the job waits.
+
+    Args:
+        video_ids: Video IDs returned by find_resumable_videos
+        include_failed: Also include renditions whose conversion failed
+        now: Reference time for the staleness check
+    """
+    now = now or timezone.now()
+    RenditionState.objects.filter(
+        _resumable_filter(include_failed, now), video_id__in=video_ids
+    ).update(status=RenditionState.PENDING, updated_at=now)
+
+
+def _resumable_filter(include_failed, now):
+    """Renditions abandoned by a crashed worker, optionally also failed ones"""
+    resumable = Q(status=RenditionState.RUNNING) & ~_live_filter(now)
+    if include_failed:
+        resumable |= Q(status=RenditionState.FAILED)
+    return resumable
+
+
+def _live_filter(now):
+    """Renditions a job is still encoding: running with a recent heartbeat"""
+    return Q(
+        status=RenditionState.RUNNING,
+        heartbeat_at__gte=now - timedelta(seconds=RENDITION_STALE_AFTER)
+    )
+
+
+def _send_heartbeats(video_id, resolutions, stop):
+    """Refresh the heartbeat of running renditions until stop is set"""
+    try:
+        while not stop.wait(RENDITION_HEARTBEAT_INTERVAL):
+            RenditionState.objects.filter(
+                video_id=video_id, resolution__in=resolutions, status=RenditionState.RUNNING
+            ).update(heartbeat_at=timezone.now())
+    finally:
+        connection.close()
@@ -0,0 +1,27 @@
+"""System checks for the media signing settings, run at startup."""
+from django.conf import settings
+from django.core.checks import Error, register
+from .constants import SIGNED_URL_EXPIRY_GRANULARITY
+
+
+@register()
+def check_media_signing(app_configs, **kwargs):
+    """Signed URLs need a secret key and must outlive every cache that holds them"""
+    if not settings.MEDIA_SIGNED_URLS:
+        return []
+
+    errors = []
+    if not settings.MEDIA_SIGNING_KEY:
+        errors.append(Error(
+            'MEDIA_SIGNING_KEY must not be empty while MEDIA_SIGNED_URLS is on.',
+            hint='With an empty key anyone can compute valid signatures.',
+            id='videos.E002',
+        ))
+    minimum = max(settings.CATALOG_RESPONSE_CACHE_TIMEOUT, SIGNED_URL_EXPIRY_GRANULARITY)
+    if settings.MEDIA_SIGNED_URL_TTL <= minimum:
+        errors.append(Error(
+            f'MEDIA_SIGNED_URL_TTL ({settings.MEDIA_SIGNED_URL_TTL}s) must be longer than {minimum}s.',
+            hint='Cached catalog responses carry signed URLs for up to CATALOG_RESPONSE_CACHE_TIMEOUT seconds.',
+            id='videos.E001',
+        ))
+    return errors
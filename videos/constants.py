@@ -16,5 +16,135 @@ RESOLUTION_CONFIGS = [
 # FFmpeg preset for encoding speed vs quality tradeoff
 FFMPEG_PRESET = 'fast'
 
+# Lines of FFmpeg's stderr kept for the error log of a failed conversion
+FFMPEG_STDERR_TAIL_LINES = 50
+
+# Live conversion progress (see progress.py): per-rendition cache key, its
+# lifetime and the minimum interval (seconds) between two publications
+PROGRESS_CACHE_KEY = 'videos:progress:{video_id}:{resolution}'
+PROGRESS_CACHE_TIMEOUT = 60 * 60
+PROGRESS_PUBLISH_INTERVAL = 2
+
+# Transcoding modes (VIDEO_TRANSCODE_MODE setting): one FFmpeg process per
+# rendition, one process decoding the source once for all renditions, or
+# keyframe-aligned chunks of the source encoded in parallel processes
+TRANSCODE_MODE_PER_RENDITION = 'per-rendition'
+TRANSCODE_MODE_SINGLE_PASS = 'single-pass'
+TRANSCODE_MODE_CHUNKED = 'chunked'
+
+# Chunked mode: target chunk length in seconds (a multiple of
+# HLS_SEGMENT_DURATION) and the directory below hls/ holding work files
+CHUNK_DURATION = 5 * 60
+CHUNK_WORK_DIRECTORY = '_chunks'
+
+# RQ queues of the conversion stages (see RQ_QUEUES): probing and posters,
+# the lowest rendition of every upload (its first playable one) and the rest
+THUMBNAIL_QUEUE = 'thumbnails'
+FAST_RENDITION_QUEUE = 'fast-renditions'
+HEAVY_RENDITION_QUEUE = 'heavy-renditions'
+
+# Shortest-job-first scheduling (see scheduling.py): job meta key of the
+# estimated cost and the height whose pixel count is one unit of cost
+ENCODE_COST_META = 'encode_cost'
+ENCODE_COST_REFERENCE_HEIGHT = 1080
+
+# Checkpointing (see checkpoints.py): a running rendition refreshes its
+# heartbeat this often (seconds) and counts as abandoned once it is older
+# than RENDITION_STALE_AFTER
+RENDITION_HEARTBEAT_INTERVAL = 30
+RENDITION_STALE_AFTER = 4 * RENDITION_HEARTBEAT_INTERVAL
+
+# Pseudo-resolution of the adaptive (multi-variant) master playlist
+MASTER_PLAYLIST_RESOLUTION = 'auto'
+MASTER_PLAYLIST_FILENAME = 'master.m3u8'
+
+# RFC 6381 codec identifiers by ffprobe profile name
+H264_PROFILE_CODECS = {
+    'Baseline': 'avc1.42E0',
+    'Constrained Baseline': 'avc1.42E0',
+    'Main': 'avc1.4D40',
+    'High': 'avc1.6400',
+}
+AAC_PROFILE_CODECS = {
+    'LC': 'mp4a.40.2',
+    'HE-AAC': 'mp4a.40.5',
+    'HE-AACv2': 'mp4a.40.29',
+}
+
 # Media root path in Docker container
 DOCKER_MEDIA_ROOT = '/app/media'
+
+# Number of videos returned per genre by the by_genre endpoint
+BY_GENRE_VIDEO_LIMIT = 10
+
+# Maximum number of ids accepted by the batch endpoint (?ids=1,2,3)
+BATCH_MAX_VIDEOS = 50
+
+# Largest id a bigint primary key can hold
+MAX_VIDEO_ID = 2**63 - 1
+
+# Cache keys and lifetime (seconds) for the featured video pool and payloads
+FEATURED_POOL_CACHE_KEY = 'videos:featured_ids'
+FEATURED_PAYLOAD_CACHE_KEY = 'videos:featured:{video_id}'
+FEATURED_PAYLOAD_CACHE_TIMEOUT = 60 * 60
+
+# How often a stale pool entry may be skipped before giving up
+FEATURED_PICK_ATTEMPTS = 3
+
+# Full-text search: text search configuration, rank weights [D, C, B, A]
+# and the annotation holding each match's rank. 'simple' avoids stemming so
+# prefix matching behaves the same for every catalog language.
+SEARCH_CONFIG = 'simple'
+SEARCH_WEIGHTS = [0.1, 0.2, 0.4, 1.0]
+SEARCH_RANK_FIELD = 'search_rank'
+
+# Cache keys for the catalog version counter and its last modification time,
+# both updated whenever a Genre, Video or VideoFile changes
+CATALOG_VERSION_CACHE_KEY = 'videos:catalog_version'
+CATALOG_MODIFIED_CACHE_KEY = 'videos:catalog_modified'
+
+# Cache key prefix for rendered catalog responses and their hit/miss counters
+RESPONSE_CACHE_KEY_PREFIX = 'videos:response'
+RESPONSE_CACHE_HITS_KEY = 'videos:response_cache:hits'
+RESPONSE_CACHE_MISSES_KEY = 'videos:response_cache:misses'
+
+# Cache key and lifetime (seconds) for playback manifests, dropped per video on change
+PLAYBACK_CACHE_KEY = 'videos:playback:{video_id}'
+PLAYBACK_CACHE_TIMEOUT = 60 * 60
+
+# Content types for HLS media, which the mimetypes module does not know
+# (or, for .ts, maps to Qt translation files)
+MEDIA_CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+}
+
+# Requests asking for more byte ranges than this get the whole file instead
+MAX_MEDIA_RANGES = 16
+
+# File types kept in the in-process media cache
+MEDIA_CACHE_EXTENSIONS = ('.ts', '.m3u8')
+
+# Media path prefixes that require a signed URL when MEDIA_SIGNED_URLS is on
+SIGNED_MEDIA_PREFIXES = ('videos/', 'hls/')
+
+# Signed URL expiry is rounded up to this many seconds, so everyone starting
+# playback within the same window gets identical (proxy-cacheable) URLs
+SIGNED_URL_EXPIRY_GRANULARITY = 5 * 60
+
+# Sparse fieldsets: query parameters and the serializer fields built from
+# the video's files (they need the files prefetch)
+SPARSE_FIELDS_PARAM = 'fields'
+SPARSE_OMIT_PARAM = 'omit'
+FILE_BACKED_FIELDS = ('available_resolutions', 'video_urls', 'video_files')
+
+# Response compression (see middleware.py)
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json',
+    'application/vnd.oai.openapi',
+    'application/vnd.oai.openapi+json',
+    'text/html',
+    'text/plain',
+)
+GZIP_COMPRESS_LEVEL = 6
+BROTLI_QUALITY = 5
@@ -0,0 +1,81 @@
+"""
+HTTP caching decorators for the catalog endpoints.
+
+Validators come from the cached catalog version, so a matching
+If-None-Match / If-Modified-Since is answered with 304 before any query
+or serialization runs. Full responses are served from the versioned
+response cache when possible.
+"""
+from functools import wraps
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from .cache import (
+    get_catalog_validators,
+    build_response_cache_key,
+    get_cached_response,
+    store_response
+)
+
+
+def _get_validators(request):
+    """Look up the catalog validators once per request"""
+    if not hasattr(request, '_catalog_validators'):
+        request._catalog_validators = get_catalog_validators()
+    return request._catalog_validators
+
+
+def catalog_etag(request, *args, **kwargs):
+    version, _ = _get_validators(request)
+    return f'W/"catalog-{version}"'
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    _, last_modified = _get_validators(request)
+    return last_modified
+
+
+def catalog_conditional(view_method):
+    """
+    Decorate a viewset method with catalog ETag / Last-Modified handling.
+    
+    Responses are marked private and must be revalidated, so browsers always
+    ask (and usually get a 304) instead of guessing freshness from Last-Modified.
+    """
+    view_method = method_decorator(condition(catalog_etag, catalog_last_modified))(view_method)
+    return method_decorator(cache_control(private=True, no_cache=True))(view_method)
+
+
+def cached_catalog_response(view_method):
+    """
+    Serve a viewset method from the rendered response cache.
+    
+    Only JSON responses are cached; the browsable API renders per-user HTML.
+    Misses are rendered right away so the exact bytes can be stored.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not settings.CATALOG_RESPONSE_CACHE_ENABLED or request.accepted_renderer.format != 'json':
+            return view_method(self, request, *args, **kwargs)
+        
+        version, _ = _get_validators(request)
+        key = build_response_cache_key(request, version)
+        cached = get_cached_response(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response.compression_cache_key = key
+            return response
+        
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            store_response(key, response.content, response['Content-Type'])
+            response.compression_cache_key = key
+        return response
+    return wrapper
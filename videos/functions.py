@@ -2,18 +2,35 @@
 Helper functions for video conversion and processing.
 These functions extract business logic to keep tasks.py lean and focused.
 """
+import glob
 import logging
+import math
 import os
 import subprocess
 from django.conf import settings
 from django.core.files import File
+from .constants import (
+    RESOLUTION_CONFIGS,
+    MASTER_PLAYLIST_RESOLUTION,
+    MASTER_PLAYLIST_FILENAME,
+    CHUNK_DURATION,
+    CHUNK_WORK_DIRECTORY
+)
 from .models import VideoFile
 from .utils import (
     get_hls_output_paths,
     build_ffmpeg_hls_command,
+    build_ffmpeg_multi_hls_command,
+    build_ffmpeg_split_command,
     run_ffmpeg_conversion,
     calculate_hls_directory_size,
-    get_media_relative_path
+    get_media_relative_path,
+    parse_hls_playlist,
+    measure_hls_bandwidth,
+    probe_media_streams,
+    probe_source,
+    build_codecs_string,
+    build_master_playlist
 )
 
 logger = logging.getLogger(__name__)
@@ -36,6 +53,83 @@ def check_resolution_exists(video, resolution):
     ).exists()
 
 
+def analyze_source(original_video_file, source_path):
+    """
+    Probe an upload once and record its metadata.
+    
+    Width, height and bitrate are stored on the original VideoFile and the
+    duration on its Video; later jobs for the same upload read them from
+    there instead of probing again.
+    
+    Args:
+        original_video_file: VideoFile instance with resolution='original'
+        source_path: Path to source video
+        
+    Returns:
+        dict: As returned by probe_source, or None if the source cannot be probed
+    """
+    video = original_video_file.video
+    if original_video_file.height:
+        return {
+            'width': original_video_file.width,
+            'height': original_video_file.height,
+            'bitrate': original_video_file.bitrate * 1000 if original_video_file.bitrate else None,
+            'duration': video.duration,
+        }
+    
+    source = probe_source(source_path)
+    if source is None:
+        return None
+    
+    original_video_file.width = source['width']
+    original_video_file.height = source['height']
+    original_video_file.bitrate = round(source['bitrate'] / 1000) if source['bitrate'] else None
+    original_video_file.save(update_fields=['width', 'height', 'bitrate'])
+    
+    if source['duration'] and video.duration != round(source['duration']):
+        video.duration = round(source['duration'])
+        video.save(update_fields=['duration', 'updated_at'])
+    
+    logger.info(
+        f"Source of {video.title}: {source['width']}x{source['height']}, "
+        f"{source['bitrate']} bit/s, {source['duration']} s"
+    )
+    return source
+
+
+def build_effective_ladder(source, configs=RESOLUTION_CONFIGS):
+    """
+    Restrict the resolution ladder to what a source can fill.
+    
+    Resolutions taller than the source are dropped and video bitrates are
+    capped at the source bitrate. A source smaller than every resolution
+    keeps only the lowest one, encoded at the source height.
+    
+    Args:
+        source: Dict as returned by analyze_source, or None if unknown
+        configs: (resolution_name, height, video_bitrate, audio_bitrate) tuples
+        
+    Returns:
+        list: Config tuples to encode; configs unchanged if the source height is unknown
+    """
+    if not source or not source.get('height'):
+        return list(configs)
+    
+    source_height = source['height'] - source['height'] % 2  # libx264 needs even dimensions
+    ladder = [config for config in configs if config[1] <= source_height]
+    if not ladder:
+        resolution, _, video_bitrate, audio_bitrate = min(configs, key=lambda config: config[1])
+        ladder = [(resolution, source_height, video_bitrate, audio_bitrate)]
+    
+    if source.get('bitrate'):
+        max_kbps = max(1, source['bitrate'] // 1000)
+        ladder = [
+            (resolution, height, f"{min(int(video_bitrate.rstrip('k')), max_kbps)}k", audio_bitrate)
+            for resolution, height, video_bitrate, audio_bitrate in ladder
+        ]
+    return ladder
+
+
 def prepare_conversion_command(source_path, resolution, base_name, height, video_bitrate, audio_bitrate):
     """
     Prepare FFmpeg conversion command and paths.
@@ -69,9 +163,100 @@ def prepare_conversion_command(source_path, resolution, base_name, height, video
     return command, hls_dir, playlist_path, segment_pattern
 
 
+def prepare_multi_conversion_command(source_path, base_name, configs):
+    """
+    Prepare a single-decode FFmpeg command for several resolutions.
+    
+    Args:
+        source_path: Path to source video
+        base_name: Base filename without extension
+        configs: (resolution_name, height, video_bitrate, audio_bitrate) tuples
+        
+    Returns:
+        tuple: (command, [(resolution, hls_dir, playlist_path), ...])
+    """
+    outputs = []
+    renditions = []
+    for resolution, height, video_bitrate, audio_bitrate in configs:
+        hls_dir, playlist_path, segment_pattern = get_hls_output_paths(source_path, resolution, base_name)
+        outputs.append((playlist_path, segment_pattern, height, video_bitrate, audio_bitrate))
+        renditions.append((resolution, hls_dir, playlist_path))
+    
+    return build_ffmpeg_multi_hls_command(source_path, outputs), renditions
+
+
+def get_chunk_work_dir(source_path, base_name):
+    """
+    Get the directory holding the chunks and per-chunk HLS output of an upload.
+    
+    Args:
+        source_path: Path to source video
+        base_name: Base filename without extension
+        
+    Returns:
+        str: Directory path below hls/, on the same file system as the renditions
+    """
+    return os.path.join(
+        os.path.dirname(os.path.dirname(source_path)),
+        'hls',
+        CHUNK_WORK_DIRECTORY,
+        base_name
+    )
+
+
+def split_into_chunks(source_path, work_dir, video_title):
+    """
+    Cut a source video at keyframes into chunks of about CHUNK_DURATION seconds.
+    
+    Args:
+        source_path: Path to source video
+        work_dir: Directory receiving the chunks
+        video_title: Video title for logging
+        
+    Returns:
+        list: Chunk paths in playback order, empty if splitting failed
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    command = build_ffmpeg_split_command(
+        source_path,
+        os.path.join(work_dir, 'chunk_%04d.mkv'),
+        CHUNK_DURATION
+    )
+    if not run_ffmpeg_conversion(command, 'chunks', video_title):
+        return []
+    return sorted(glob.glob(os.path.join(work_dir, 'chunk_*.mkv')))
+
+
+def prepare_chunk_conversion_command(chunk_path, work_dir, chunk_index, configs):
+    """
+    Prepare a single-decode FFmpeg command encoding one chunk to several resolutions.
+    
+    Args:
+        chunk_path: Path to the chunk
+        work_dir: Chunk work directory (see get_chunk_work_dir)
+        chunk_index: Position of the chunk in the source
+        configs: (resolution_name, height, video_bitrate, audio_bitrate) tuples
+        
+    Returns:
+        tuple: (command, {resolution: chunk_playlist_path})
+    """
+    outputs = []
+    playlists = {}
+    for resolution, height, video_bitrate, audio_bitrate in configs:
+        chunk_dir = os.path.join(work_dir, resolution, f'{chunk_index:04d}')
+        os.makedirs(chunk_dir, exist_ok=True)
+        playlist_path = os.path.join(chunk_dir, 'playlist.m3u8')
+        segment_pattern = os.path.join(chunk_dir, 'segment_%03d.ts')
+        outputs.append((playlist_path, segment_pattern, height, video_bitrate, audio_bitrate))
+        playlists[resolution] = playlist_path
+    
+    return build_ffmpeg_multi_hls_command(chunk_path, outputs), playlists
+
+
 def create_video_file_entry(video, resolution, playlist_path, hls_dir):
     """
     Create VideoFile database entry for converted video.
+    Width, height and average bitrate are measured from the HLS output.
     
     Args:
         video: Video instance
@@ -89,12 +274,17 @@ def create_video_file_entry(video, resolution, playlist_path, hls_dir):
     try:
         media_relative_path = get_media_relative_path(playlist_path)
         total_size = calculate_hls_directory_size(hls_dir)
+        width, height = _probe_rendition_dimensions(playlist_path)
+        _, average_bandwidth = measure_hls_bandwidth(playlist_path)
         
         VideoFile.objects.create(
             video=video,
             resolution=resolution,
             file=media_relative_path,
             file_size=total_size,
+            width=width,
+            height=height,
+            bitrate=math.ceil(average_bandwidth / 1000) or None,
             is_processed=True
         )
         logger.info(f"Created HLS VideoFile entry for {resolution}: {media_relative_path}")
@@ -105,6 +295,104 @@ def create_video_file_entry(video, resolution, playlist_path, hls_dir):
         return False
 
 
+def create_master_playlist(video, source_path, base_name):
+    """
+    Write the adaptive master playlist over all HLS renditions of a video
+    and record it as the 'auto' VideoFile.
+    
+    Variant attributes are measured from the actual output: bandwidth from
+    segment sizes and durations, resolution and codecs from ffprobe.
+    
+    Args:
+        video: Video instance
+        source_path: Path to source video
+        base_name: Base filename without extension
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    renditions = VideoFile.objects.filter(
+        video=video,
+        resolution__in=[name for name, *_ in RESOLUTION_CONFIGS]
+    )
+    hls_dir, _, _ = get_hls_output_paths(source_path, MASTER_PLAYLIST_RESOLUTION, base_name)
+    master_path = os.path.join(hls_dir, MASTER_PLAYLIST_FILENAME)
+    
+    variants = [
+        variant for variant in (_describe_variant(rendition, hls_dir) for rendition in renditions)
+        if variant
+    ]
+    if not variants:
+        logger.error(f"No HLS renditions available for master playlist of {video.title}")
+        return False
+    
+    try:
+        with open(master_path, 'w') as master:
+            master.write(build_master_playlist(variants))
+        
+        VideoFile.objects.update_or_create(
+            video=video,
+            resolution=MASTER_PLAYLIST_RESOLUTION,
+            defaults={
+                'file': get_media_relative_path(master_path),
+                'file_size': os.path.getsize(master_path),
+                'is_processed': True
+            }
+        )
+        logger.info(f"Created master playlist with {len(variants)} variants for {video.title}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error creating master playlist for {video.title}: {str(e)}")
+        return False
+
+
+def _probe_rendition_dimensions(playlist_path):
+    """
+    Read the frame size of a rendition from its first segment.
+    
+    Returns:
+        tuple: (width, height), (None, None) if unknown
+    """
+    segments = parse_hls_playlist(playlist_path)
+    if not segments:
+        return None, None
+    
+    streams = probe_media_streams(os.path.join(os.path.dirname(playlist_path), segments[0][1]))
+    video_stream = next((s for s in streams if s.get('codec_type') == 'video'), {})
+    return video_stream.get('width'), video_stream.get('height')
+
+
+def _describe_variant(rendition, master_dir):
+    """
+    Collect master playlist attributes for one rendition.
+    
+    Returns:
+        dict: Variant attributes, or None if the rendition has no segments
+    """
+    playlist_path = rendition.file.path
+    if not os.path.exists(playlist_path):
+        return None
+    
+    segments = parse_hls_playlist(playlist_path)
+    if not segments:
+        return None
+    
+    peak, average = measure_hls_bandwidth(playlist_path)
+    first_segment = os.path.join(os.path.dirname(playlist_path), segments[0][1])
+    streams = probe_media_streams(first_segment)
+    video_stream = next((s for s in streams if s.get('codec_type') == 'video'), {})
+    
+    return {
+        'uri': os.path.relpath(playlist_path, master_dir).replace(os.sep, '/'),
+        'bandwidth': peak,
+        'average_bandwidth': average,
+        'width': video_stream.get('width'),
+        'height': video_stream.get('height'),
+        'codecs': build_codecs_string(streams),
+    }
+
+
 def generate_thumbnail(video, source_path, base_name):
     """
     Generate thumbnail image from video at 3 seconds.
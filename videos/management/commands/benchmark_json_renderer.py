@@ -0,0 +1,82 @@
+"""
+Compare DRF's JSONRenderer with FastJSONRenderer on catalog payloads.
+
+Creates the videos inside a transaction that is rolled back afterwards, so
+it can run against any database:
+
+    python manage.py benchmark_json_renderer --count 1000 --rounds 20
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from videos.models import Genre, Video, VideoFile
+from videos.renderers import FastJSONRenderer, orjson
+from videos.serializers import VideoDetailSerializer, VideoListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON rendering of video list/detail payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='Number of videos per payload')
+        parser.add_argument('--rounds', type=int, default=20, help='Render repetitions per renderer')
+
+    def handle(self, *args, count, rounds, **options):
+        with transaction.atomic():
+            payloads = self._build_payloads(count)
+            transaction.set_rollback(True)
+
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed, FastJSONRenderer falls back to stdlib'))
+
+        for name, data in payloads.items():
+            self.stdout.write(f'{name} ({count} videos, best of {rounds}):')
+            baseline = None
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                best = self._time_render(renderer, data, rounds)
+                baseline = baseline or best
+                self.stdout.write(
+                    f'  {type(renderer).__name__:<18} {best * 1000:8.2f} ms  {baseline / best:5.1f}x'
+                )
+            identical = JSONRenderer().render(data) == FastJSONRenderer().render(data)
+            self.stdout.write(f'  identical output: {identical}')
+
+    def _build_payloads(self, count):
+        genre = Genre.objects.create(name='Benchmark', slug='benchmark-json-renderer')
+        videos = Video.objects.bulk_create([
+            Video(
+                title=f'Benchmark video {index} – “Ünïcode”',
+                description='Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4,
+                genre=genre,
+                duration=5400,
+                release_year=2000 + index % 25,
+                thumbnail=f'thumbnails/video_{index}.jpg',
+            )
+            for index in range(count)
+        ])
+        VideoFile.objects.bulk_create([
+            VideoFile(
+                video=video, resolution=resolution, file=f'hls/{resolution}/video_{video.pk}/playlist.m3u8',
+                file_size=1024 * 1024, width=width, height=height, bitrate=bitrate, is_processed=True
+            )
+            for video in videos
+            for resolution, width, height, bitrate in (
+                ('480p', 854, 480, 1400), ('720p', 1280, 720, 2800), ('1080p', 1920, 1080, 5000)
+            )
+        ])
+
+        queryset = list(Video.objects.with_api_relations().filter(genre=genre))
+        started = time.perf_counter()
+        list_data = VideoListSerializer(queryset, many=True).data
+        detail_data = VideoDetailSerializer(queryset, many=True).data
+        self.stdout.write(f'serializers: {(time.perf_counter() - started) * 1000:.2f} ms for both payloads')
+        return {'list': list_data, 'detail': detail_data}
+
+    def _time_render(self, renderer, data, rounds):
+        best = float('inf')
+        for _ in range(rounds):
+            started = time.perf_counter()
+            renderer.render(data)
+            best = min(best, time.perf_counter() - started)
+        return best
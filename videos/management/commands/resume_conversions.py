@@ -0,0 +1,35 @@
+"""
+Re-enqueue conversions that a crashed worker left unfinished.
+
+A rendition counts as abandoned once it is 'running' without a heartbeat
+for RENDITION_STALE_AFTER seconds. The new jobs skip finished renditions
+and discard the partial output of the abandoned ones. Resumed renditions
+are marked pending, so the command can run periodically (the container
+entrypoint runs it every RESUME_CONVERSIONS_INTERVAL seconds):
+
+    python manage.py resume_conversions [--failed]
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from videos.checkpoints import find_resumable_videos, requeue_renditions
+from videos.models import VideoFile
+from videos.tasks import enqueue_conversion
+
+
+class Command(BaseCommand):
+    help = 'Resume HLS conversions interrupted by a worker crash'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help='Also retry renditions whose conversion failed')
+
+    def handle(self, *args, failed, **options):
+        now = timezone.now()
+        video_ids = find_resumable_videos(include_failed=failed, now=now)
+        originals = VideoFile.objects.filter(video_id__in=video_ids, resolution='original').select_related('video')
+
+        for original in originals:
+            enqueue_conversion(original.id)
+            requeue_renditions([original.video_id], include_failed=failed, now=now)
+            self.stdout.write(f'Resumed conversion of {original.video.title}')
+
+        self.stdout.write(self.style.SUCCESS(f'{len(originals)} conversion(s) resumed'))
@@ -0,0 +1,284 @@
+"""
+Media file delivery.
+
+Django resolves and checks the requested file, then either streams it
+in-process or hands the transfer to the front proxy via X-Accel-Redirect
+(nginx) or X-Sendfile (Apache / lighttpd), depending on MEDIA_DELIVERY_MODE.
+
+In-process delivery supports single and multiple byte ranges. Single ranges
+are sent through FileResponse with a length-bounded file object, so WSGI
+servers with sendfile support (gunicorn) copy the bytes in the kernel;
+multiple ranges are streamed as mmap slices. Whole HLS segments and
+playlists are served from the per-process cache in media_cache.py.
+
+With MEDIA_SIGNED_URLS enabled, video files are only served through the
+signed route (see signing.py); plain requests for them get a 403.
+"""
+import mimetypes
+import mmap
+import os
+import re
+import uuid
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import serve, was_modified_since
+from .constants import MEDIA_CONTENT_TYPES, MAX_MEDIA_RANGES, MEDIA_CACHE_EXTENSIONS
+from .media_cache import media_file_cache
+from .signing import normalize_media_path, requires_signature, verify_media_signature
+
+RANGE_SPEC_PATTERN = re.compile(r'^(\d*)-(\d*)$')
+MULTI_RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def serve_media(request, path):
+    """Serve a file below MEDIA_ROOT, refusing files that need a signed URL"""
+    path = _normalized_or_404(path)
+    if requires_signature(path):
+        return HttpResponseForbidden('Signed URL required')
+    return deliver_media(request, path)
+
+
+def serve_signed_media(request, expires, signature, path):
+    """Serve a file below MEDIA_ROOT after checking its URL signature"""
+    path = _normalized_or_404(path)
+    if not verify_media_signature(path, expires, signature):
+        return HttpResponseForbidden('Invalid or expired signature')
+    return deliver_media(request, path)
+
+
+def _normalized_or_404(path):
+    """
+    Normalise a requested path, so the access check, the signature scope and
+    the file that is sent all refer to the same path
+    """
+    normalized = normalize_media_path(path)
+    if normalized is None:
+        raise Http404('Media file not found')
+    return normalized
+
+
+def deliver_media(request, path):
+    """Send a file below MEDIA_ROOT (path normalised by the caller) using the configured delivery mode"""
+    full_path = resolve_media_path(path)
+    mode = settings.MEDIA_DELIVERY_MODE
+    
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=guess_content_type(full_path))
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        return response
+    
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=guess_content_type(full_path))
+        # Percent-encoded like X-Accel-Redirect: header values must be latin-1,
+        # and mod_xsendfile (XSendFileUnescape) and lighttpd decode them
+        response['X-Sendfile'] = quote(full_path)
+        return response
+    
+    if mode == 'django':
+        return _serve_in_process(request, path, full_path)
+    
+    raise ImproperlyConfigured(f"Unknown MEDIA_DELIVERY_MODE: {mode}")
+
+
+def resolve_media_path(path):
+    """
+    Map a request path to an existing file below MEDIA_ROOT.
+    
+    Args:
+        path: Path relative to MEDIA_URL
+        
+    Returns:
+        str: Absolute file path
+        
+    Raises:
+        Http404: If the path escapes MEDIA_ROOT or is not a file
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Media file not found')
+    
+    if not os.path.isfile(full_path):
+        raise Http404('Media file not found')
+    return full_path
+
+
+def guess_content_type(path):
+    """Return the content type of a media file, knowing HLS playlists and segments"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in MEDIA_CONTENT_TYPES:
+        return MEDIA_CONTENT_TYPES[extension]
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def parse_range_header(header, size):
+    """
+    Parse a Range header into byte ranges
+    
+    Args:
+        header: Value of the Range header, or None
+        size: File size in bytes
+        
+    Returns:
+        list: (start, end) tuples with inclusive ends, empty if no range is
+              satisfiable, or None if the header is absent, malformed or
+              asks for too many ranges (the whole file is sent then)
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    
+    specs = [spec.strip() for spec in header[len('bytes='):].split(',')]
+    if len(specs) > MAX_MEDIA_RANGES:
+        return None
+    
+    ranges = []
+    for spec in specs:
+        match = RANGE_SPEC_PATTERN.match(spec)
+        if not match or match.groups() == ('', ''):
+            return None
+        
+        first, last = match.groups()
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+        
+        if start < size:
+            ranges.append((start, end))
+    
+    return ranges
+
+
+class FileSlice:
+    """
+    Read-only view on `length` bytes of an open file, starting at its current position.
+    
+    It exposes fileno() so wsgi.file_wrapper implementations can use
+    os.sendfile(); those read the offset from the descriptor and the length
+    from Content-Length. Without tell()/seek(), FileResponse leaves
+    Content-Length to the caller.
+    """
+    
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+    
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+    
+    def fileno(self):
+        return self.file.fileno()
+    
+    def close(self):
+        self.file.close()
+
+
+def _serve_in_process(request, path, full_path):
+    """Stream a media file from this process, honouring Range requests"""
+    stat = os.stat(full_path)
+    last_modified = http_date(stat.st_mtime)
+    content_type = guess_content_type(full_path)
+    
+    ranges = None
+    if request.META.get('HTTP_IF_RANGE', last_modified) == last_modified:
+        ranges = parse_range_header(request.META.get('HTTP_RANGE'), stat.st_size)
+    
+    if ranges is None:
+        if full_path.endswith(MEDIA_CACHE_EXTENSIONS) and media_file_cache.accepts(stat):
+            return _cached_file_response(request, full_path, stat, last_modified, content_type)
+        response = serve(request, path, document_root=settings.MEDIA_ROOT)
+        if response.status_code == 200:
+            response['Content-Type'] = content_type
+        response['Accept-Ranges'] = 'bytes'
+        return response
+    
+    if not ranges:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+    elif len(ranges) == 1:
+        response = _single_range_response(full_path, ranges[0], stat.st_size, content_type)
+    else:
+        response = _multi_range_response(full_path, ranges, stat.st_size, content_type)
+    
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = last_modified
+    return response
+
+
+def _cached_file_response(request, full_path, stat, last_modified, content_type):
+    """Serve a whole file from the in-process cache, reading it on a miss"""
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        return HttpResponseNotModified()
+    
+    data = media_file_cache.get(full_path, stat)
+    cache_status = 'HIT'
+    if data is None:
+        with open(full_path, 'rb') as file:
+            data = file.read()
+        media_file_cache.put(full_path, stat, data)
+        cache_status = 'MISS'
+    
+    response = HttpResponse(data, content_type=content_type)
+    response['Last-Modified'] = last_modified
+    response['Accept-Ranges'] = 'bytes'
+    response['X-Media-Cache'] = cache_status
+    return response
+
+
+def _single_range_response(full_path, byte_range, size, content_type):
+    start, end = byte_range
+    file = open(full_path, 'rb', buffering=0)
+    file.seek(start)
+    
+    response = FileResponse(FileSlice(file, end - start + 1), status=206, content_type=content_type)
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def _multi_range_response(full_path, ranges, size, content_type):
+    boundary = uuid.uuid4().hex
+    parts = [
+        (
+            f'\r\n--{boundary}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+        ).encode('ascii')
+        for start, end in ranges
+    ]
+    closing = f'\r\n--{boundary}--\r\n'.encode('ascii')
+    
+    def stream():
+        with open(full_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for header, (start, end) in zip(parts, ranges):
+                yield header
+                for offset in range(start, end + 1, MULTI_RANGE_CHUNK_SIZE):
+                    yield mapped[offset:min(offset + MULTI_RANGE_CHUNK_SIZE, end + 1)]
+            yield closing
+    
+    response = StreamingHttpResponse(
+        stream(),
+        status=206,
+        content_type=f'multipart/byteranges; boundary={boundary}'
+    )
+    response['Content-Length'] = (
+        sum(len(header) for header in parts)
+        + sum(end - start + 1 for start, end in ranges)
+        + len(closing)
+    )
+    return response
@@ -0,0 +1,128 @@
+"""
+In-process LRU cache for hot HLS segments and playlists.
+
+Every worker process keeps the most recently served files in memory, up to
+a byte budget. Entries are validated against the file's mtime and size on
+each lookup, so re-encoded files are picked up without explicit invalidation.
+Every MEDIA_CACHE_STATS_INTERVAL seconds a process logs its hit rate and
+memory use on the next lookup.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MediaFileCache:
+    """Byte-budgeted, thread-safe LRU mapping file paths to their contents"""
+    
+    def __init__(self, max_bytes, max_entry_bytes, stats_interval=0, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.stats_interval = stats_interval
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stats_logged_at = clock()
+        self.lock = threading.Lock()
+    
+    def get(self, path, stat):
+        """
+        Return cached contents of a file if they match its current stat
+        
+        Args:
+            path: Absolute file path
+            stat: os.stat_result of the file
+            
+        Returns:
+            bytes: File contents, or None on a miss
+        """
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == (stat.st_mtime_ns, stat.st_size):
+                self.entries.move_to_end(path)
+                self.hits += 1
+                data = entry[1]
+            else:
+                if entry is not None:
+                    self._remove(path)
+                self.misses += 1
+                data = None
+        
+        self._log_stats_if_due()
+        return data
+    
+    def put(self, path, stat, data):
+        """Store file contents, evicting least recently used entries to stay within budget"""
+        if len(data) > min(self.max_entry_bytes, self.max_bytes):
+            return
+        
+        with self.lock:
+            if path in self.entries:
+                self._remove(path)
+            self.entries[path] = ((stat.st_mtime_ns, stat.st_size), data)
+            self.size += len(data)
+            
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+    
+    def accepts(self, stat):
+        """Whether a file of this size may be cached at all"""
+        return 0 < stat.st_size <= min(self.max_entry_bytes, self.max_bytes)
+    
+    def stats(self):
+        """
+        Return cache statistics of this process
+        
+        Returns:
+            dict: hits, misses, hit_rate, entries and bytes
+        """
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.size,
+            }
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.stats_logged_at = self.clock()
+    
+    def _log_stats_if_due(self):
+        if not self.stats_interval:
+            return
+        with self.lock:
+            now = self.clock()
+            if now - self.stats_logged_at < self.stats_interval:
+                return
+            self.stats_logged_at = now
+        
+        stats = self.stats()
+        logger.info(
+            f"Media cache (pid {os.getpid()}): {stats['hits']} hits, {stats['misses']} misses, "
+            f"hit rate {stats['hit_rate']:.1%}, {stats['entries']} entries, {stats['bytes']} bytes"
+        )
+    
+    def _remove(self, path):
+        _, data = self.entries.pop(path)
+        self.size -= len(data)
+
+
+media_file_cache = MediaFileCache(
+    settings.MEDIA_CACHE_MAX_BYTES,
+    settings.MEDIA_CACHE_MAX_ENTRY_BYTES,
+    stats_interval=settings.MEDIA_CACHE_STATS_INTERVAL
+)
@@ -0,0 +1,151 @@
+"""
+Accept-Encoding negotiated compression for API responses.
+
+Brotli is used when the brotli package is installed and the client accepts
+it, gzip otherwise. Only complete (non-streaming) 200 responses to GET/HEAD
+requests are compressed, above COMPRESSION_MIN_SIZE and with an allowlisted
+content type. Media files and responses setting cookies are left alone;
+the latter keeps secrets out of compressed bodies (BREACH).
+
+Responses from the catalog response cache carry `compression_cache_key`;
+their compressed bytes are cached next to the rendered bytes, so a hot
+response is compressed once per catalog version and encoding.
+"""
+import gzip
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from .cache import (
+    aget_compressed_response,
+    astore_compressed_response,
+    get_compressed_response,
+    store_compressed_response
+)
+from .constants import COMPRESSIBLE_CONTENT_TYPES, GZIP_COMPRESS_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        
+        response = self.get_response(request)
+        encoding = select_encoding(request, response)
+        if encoding is None:
+            return response
+        
+        key = getattr(response, 'compression_cache_key', None)
+        content = get_compressed_response(key, encoding) if key else None
+        if content is None:
+            content = compress(response.content, encoding)
+            if key:
+                store_compressed_response(key, encoding, content)
+        return apply_encoding(response, encoding, content)
+    
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        encoding = select_encoding(request, response)
+        if encoding is None:
+            return response
+        
+        key = getattr(response, 'compression_cache_key', None)
+        content = await aget_compressed_response(key, encoding) if key else None
+        if content is None:
+            content = compress(response.content, encoding)
+            if key:
+                await astore_compressed_response(key, encoding, content)
+        return apply_encoding(response, encoding, content)
+
+
+def select_encoding(request, response):
+    """
+    Decide whether and how to compress a response, adding Vary: Accept-Encoding
+    to every response that could have been compressed.
+    
+    Returns:
+        str: 'br' or 'gzip', or None to send the response as is
+    """
+    if (
+        response.streaming
+        or response.status_code != 200
+        or request.method not in ('GET', 'HEAD')
+        or request.path.startswith(settings.MEDIA_URL)
+        or response.has_header('Content-Encoding')
+        or response.cookies
+        or response.get('Content-Type', '').split(';')[0].strip() not in COMPRESSIBLE_CONTENT_TYPES
+    ):
+        return None
+    
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+        return None
+    return negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+
+
+def negotiate_encoding(header):
+    """
+    Pick the best supported encoding from an Accept-Encoding header
+    
+    Args:
+        header: Accept-Encoding value, e.g. 'gzip, deflate, br;q=0.9'
+        
+    Returns:
+        str: Encoding with the highest q-value, ties going to the server's
+             preference, or None if no supported encoding is acceptable
+    """
+    qualities = {}
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output deterministic, so cached and fresh bytes match
+    return gzip.compress(content, compresslevel=GZIP_COMPRESS_LEVEL, mtime=0)
+
+
+def apply_encoding(response, encoding, content):
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    response['Content-Encoding'] = encoding
+    # The compressed body is no longer byte-identical to the uncompressed one
+    etag = response.get('ETag')
+    if etag and not etag.startswith('W/'):
+        response['ETag'] = f'W/{etag}'
+    return response
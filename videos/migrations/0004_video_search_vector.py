@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:07
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_VECTOR_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['search_vector'], name='video_search_vector_idx'
+)
+
+
+def create_search_index(apps, schema_editor):
+    """Create the GIN index and fill the vectors of existing videos (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.search import SearchVector
+
+    Video = apps.get_model('videos', 'Video')
+    schema_editor.add_index(Video, SEARCH_VECTOR_INDEX)
+    Video.objects.update(
+        search_vector=SearchVector('title', weight='A', config='simple')
+        + SearchVector('description', weight='B', config='simple')
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('videos', 'Video'), SEARCH_VECTOR_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0003_video_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='video',
+                    index=SEARCH_VECTOR_INDEX,
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0004_video_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='videofile',
+            name='resolution',
+            field=models.CharField(choices=[('auto', 'Auto (adaptive)'), ('original', 'Original'), ('1080p', '1080p'), ('720p', '720p'), ('360p', '360p'), ('120p', '120p')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0005_videofile_auto_resolution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenditionState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('auto', 'Auto (adaptive)'), ('original', 'Original'), ('1080p', '1080p'), ('720p', '720p'), ('360p', '360p'), ('120p', '120p')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rendition_states', to='videos.video')),
+            ],
+            options={
+                'verbose_name': 'Rendition State',
+                'verbose_name_plural': 'Rendition States',
+                'ordering': ['video', 'resolution'],
+                'unique_together': {('video', 'resolution')},
+            },
+        ),
+    ]
@@ -1,5 +1,10 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.contrib.auth import get_user_model
+from .constants import FILE_BACKED_FIELDS
 
 User = get_user_model()
 
@@ -14,6 +19,41 @@ class Genre(models.Model):
     class Meta:
         ordering = ['name']
 
+class VideoQuerySet(models.QuerySet):
+    def with_api_relations(self):
+        """Load genre and video files up front so serializers don't query per row"""
+        return self.select_related('genre').prefetch_related('files').defer('search_vector')
+
+    def with_api_fields(self, fields, extra_columns=()):
+        """
+        Like with_api_relations(), but only load what the given serializer fields need.
+        
+        Args:
+            fields: Serializer field names that will be rendered
+            extra_columns: Columns needed regardless, e.g. the ordering keys
+        """
+        concrete = {field.name for field in self.model._meta.concrete_fields}
+        columns = {'id', *extra_columns} | (set(fields) & concrete)
+        queryset = self
+        
+        if 'genre' in fields:
+            queryset = queryset.select_related('genre')
+            columns |= {'genre__id', 'genre__name', 'genre__slug'}
+        if set(fields) & set(FILE_BACKED_FIELDS):
+            queryset = queryset.prefetch_related('files')
+        return queryset.only(*sorted(columns))
+
+    def top_per_genre(self, limit):
+        """Return at most `limit` newest videos per genre using a single windowed query"""
+        return self.annotate(
+            genre_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('genre_id')],
+                order_by=[F('created_at').desc(), F('id').desc()],
+            )
+        ).filter(genre_rank__lte=limit).order_by('genre__name', 'genre_rank')
+
+
 class Video(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -34,8 +74,20 @@ class Video(models.Model):
     # Featured video for hero section
     is_featured = models.BooleanField(default=False)
     
+    # Weighted title/description tsvector, maintained by search.py
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+    
+    objects = VideoQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        # Back the keyset pagination orderings, see pagination.py
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='video_created_at_id_idx'),
+            models.Index(fields=['title', 'id'], name='video_title_id_idx'),
+            models.Index(fields=['release_year', 'id'], name='video_release_year_id_idx'),
+            GinIndex(fields=['search_vector'], name='video_search_vector_idx'),
+        ]
         
     def __str__(self):
         return self.title
@@ -48,6 +100,8 @@ class Video(models.Model):
     @property
     def available_resolutions(self):
         """Return list of available video resolutions"""
+        if 'files' in getattr(self, '_prefetched_objects_cache', {}):
+            return sorted(video_file.resolution for video_file in self.files.all())
         return list(self.files.values_list('resolution', flat=True).order_by('resolution'))
     
     def get_video_url(self, resolution='original'):
@@ -66,6 +120,7 @@ class VideoFile(models.Model):
     """Stores different resolution versions of a video"""
     
     RESOLUTION_CHOICES = [
+        ('auto', 'Auto (adaptive)'),
         ('original', 'Original'),
         ('1080p', '1080p'),
         ('720p', '720p'),
@@ -101,3 +156,40 @@ class VideoFile(models.Model):
         if self.file and not self.file_size:
             self.file_size = self.file.size
         super().save(*args, **kwargs)
+
+
+class RenditionState(models.Model):
+    """
+    Progress of one rendition's conversion, so interrupted work can be resumed.
+    
+    A running rendition whose heartbeat stopped belongs to a worker that
+    died; see checkpoints.py.
+    """
+    
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='rendition_states')
+    resolution = models.CharField(max_length=10, choices=VideoFile.RESOLUTION_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['video', 'resolution']
+        ordering = ['video', 'resolution']
+        verbose_name = 'Rendition State'
+        verbose_name_plural = 'Rendition States'
+    
+    def __str__(self):
+        return f"{self.video.title} - {self.resolution}: {self.status}"
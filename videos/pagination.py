@@ -0,0 +1,173 @@
+"""
+Keyset (cursor) pagination for the catalog endpoints.
+
+DRF's CursorPagination only keys on the first ordering field and falls back
+to an OFFSET for ties, which degrades on low-cardinality fields such as
+release_year. This paginator keys on the full (field, id) tuple, so every
+page is a bounded index range scan no matter how deep the client pages.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination over (ordering field, id).
+
+    NULL values sort as the largest value (Postgres' default), so ascending
+    and descending orderings are both served by a single (field, id) index.
+    Clients may opt into a different page size with ?page_size=, capped by
+    the CATALOG_MAX_PAGE_SIZE setting.
+    """
+    ordering = '-created_at'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.CATALOG_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.keys = self._get_keys(queryset, self.get_ordering(request, queryset, view))
+
+        position, reverse = self.decode_cursor(request)
+        keys = [(name, not descending) for name, descending in self.keys] if reverse else self.keys
+
+        if position is not None:
+            try:
+                position = self._parse_position(queryset, position)
+                queryset = queryset.filter(_keyset_after(keys, position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        queryset = queryset.order_by(*[_order_expression(name, descending) for name, descending in keys])
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor((self._get_position(self.page[-1]), False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor((self._get_position(self.page[0]), True))
+
+    def decode_cursor(self, request):
+        """Return (position, reverse) from the request, position is None for the first page"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = tokens['p'], bool(tokens.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, cursor):
+        position, reverse = cursor
+        tokens = {'p': position}
+        if reverse:
+            tokens['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(tokens, default=str).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_keys(self, queryset, ordering):
+        """
+        Build the keyset from the first requested ordering, adding the primary
+        key as a tie-breaker unless the field is already unique.
+        """
+        field_name = ordering[0].lstrip('-')
+        descending = ordering[0].startswith('-')
+        try:
+            model_field = queryset.model._meta.get_field(field_name)
+            is_unique = model_field.primary_key or model_field.unique
+        except FieldDoesNotExist:
+            # Annotations such as the search rank
+            is_unique = False
+
+        keys = [(field_name, descending)]
+        if not is_unique:
+            keys.append(('id', descending))
+        return keys
+
+    def _parse_position(self, queryset, position):
+        """
+        Convert the cursor's JSON values with their key fields, so a crafted
+        cursor fails here instead of in the database query.
+
+        Raises:
+            TypeError, ValueError, ValidationError: If a value does not fit its field
+        """
+        parsed = []
+        for (name, _), value in zip(self.keys, position):
+            if value is not None:
+                field = _key_field(queryset, name)
+                value = field.to_python(value)
+                field.run_validators(value)
+            parsed.append(value)
+        return parsed
+
+    def _get_position(self, instance):
+        return [getattr(instance, name) for name, _ in self.keys]
+
+
+def _key_field(queryset, name):
+    """Model field or annotation output field of a key"""
+    try:
+        return queryset.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return queryset.query.annotations[name].output_field
+
+
+def _order_expression(name, descending):
+    if descending:
+        return F(name).desc(nulls_first=True)
+    return F(name).asc(nulls_last=True)
+
+
+def _keyset_after(keys, position):
+    """
+    Build a filter matching rows strictly after `position` in the given order.
+
+    Expands the tuple comparison into (a > x) OR (a = x AND b > y) ..., where
+    "greater" respects each key's direction and NULL counts as the largest value.
+    """
+    condition = Q(pk__in=[])
+    equal_so_far = Q()
+
+    for (name, descending), value in zip(keys, position):
+        if value is None:
+            after = Q(**{f'{name}__isnull': False}) if descending else Q(pk__in=[])
+            equal = Q(**{f'{name}__isnull': True})
+        elif descending:
+            after = Q(**{f'{name}__lt': value})
+            equal = Q(**{name: value})
+        else:
+            after = Q(**{f'{name}__gt': value}) | Q(**{f'{name}__isnull': True})
+            equal = Q(**{name: value})
+
+        condition |= equal_so_far & after
+        equal_so_far &= equal
+
+    return condition
@@ -0,0 +1,149 @@
+"""
+Playback bootstrap data: everything the player needs to start a video,
+loaded with a single query and cached per video.
+"""
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from .constants import PLAYBACK_CACHE_KEY, PLAYBACK_CACHE_TIMEOUT
+from .models import Video, VideoFile
+from .signing import sign_media_url
+
+RESOLUTION_ORDER = [resolution for resolution, _ in VideoFile.RESOLUTION_CHOICES]
+
+
+def get_playback_manifest(video_id):
+    """
+    Return the cached playback manifest of a video, loading it on a miss.
+    
+    Args:
+        video_id: ID of the video
+        
+    Returns:
+        dict: Manifest with duration, poster and renditions, or None if the video does not exist
+    """
+    key = PLAYBACK_CACHE_KEY.format(video_id=video_id)
+    manifest = cache.get(key)
+    if manifest is None:
+        manifest = build_playback_manifest(video_id)
+        if manifest is not None:
+            cache.set(key, manifest, PLAYBACK_CACHE_TIMEOUT)
+    return manifest
+
+
+def build_playback_manifest(video_id):
+    """
+    Load a video and all of its files in one LEFT JOIN query.
+    
+    Args:
+        video_id: ID of the video
+        
+    Returns:
+        dict: Manifest, or None if the video does not exist
+    """
+    return _manifest_from_rows(list(_manifest_rows(video_id)))
+
+
+async def aget_playback_manifest(video_id):
+    """Async get_playback_manifest(), using the async cache and ORM APIs"""
+    key = PLAYBACK_CACHE_KEY.format(video_id=video_id)
+    manifest = await cache.aget(key)
+    if manifest is None:
+        manifest = _manifest_from_rows([row async for row in _manifest_rows(video_id)])
+        if manifest is not None:
+            await cache.aset(key, manifest, PLAYBACK_CACHE_TIMEOUT)
+    return manifest
+
+
+def _manifest_rows(video_id):
+    return Video.objects.filter(pk=video_id).values(
+        'id', 'title', 'duration', 'thumbnail', 'preview_image',
+        'files__resolution', 'files__file', 'files__file_size',
+        'files__width', 'files__height', 'files__bitrate'
+    )
+
+
+def _manifest_from_rows(rows):
+    if not rows:
+        return None
+    
+    video = rows[0]
+    renditions = [
+        {
+            'resolution': row['files__resolution'],
+            'url': default_storage.url(row['files__file']),
+            'bitrate': row['files__bitrate'],
+            'width': row['files__width'],
+            'height': row['files__height'],
+            'file_size': row['files__file_size'],
+        }
+        for row in rows
+        if row['files__file']
+    ]
+    renditions.sort(key=lambda rendition: RESOLUTION_ORDER.index(rendition['resolution']))
+    
+    return {
+        'id': video['id'],
+        'title': video['title'],
+        'duration': video['duration'],
+        'poster': _media_url(video['preview_image'] or video['thumbnail']),
+        'thumbnail': _media_url(video['thumbnail']),
+        'renditions': renditions,
+    }
+
+
+def select_rendition(manifest, resolution):
+    """
+    Pick the rendition for a resolution, falling back to the original file.
+    
+    Returns:
+        dict: Rendition, or None if neither is available
+    """
+    by_resolution = {rendition['resolution']: rendition for rendition in manifest['renditions']}
+    return by_resolution.get(resolution) or by_resolution.get('original')
+
+
+def sign_playback_manifest(manifest):
+    """
+    Return a copy of a manifest with signed media URLs.
+    
+    The cached manifest holds plain URLs; signing happens per response so
+    every client gets a fresh expiry.
+    """
+    return {
+        **manifest,
+        'poster': sign_media_url(manifest['poster']),
+        'thumbnail': sign_media_url(manifest['thumbnail']),
+        'renditions': [
+            {**rendition, 'url': sign_media_url(rendition['url'])}
+            for rendition in manifest['renditions']
+        ],
+    }
+
+
+def build_playback_response(manifest, resolution):
+    """
+    Build the playback endpoint payload: the signed manifest plus the selected rendition.
+    
+    Args:
+        manifest: Cached playback manifest
+        resolution: Requested resolution
+        
+    Returns:
+        dict: Response payload
+    """
+    manifest = sign_playback_manifest(manifest)
+    rendition = select_rendition(manifest, resolution)
+    return {
+        **manifest,
+        'resolution': rendition['resolution'] if rendition else None,
+        'video_url': rendition['url'] if rendition else None
+    }
+
+
+def invalidate_playback_manifest(video_id):
+    """Drop the cached manifest of a video"""
+    cache.delete(PLAYBACK_CACHE_KEY.format(video_id=video_id))
+
+
+def _media_url(name):
+    return default_storage.url(name) if name else None
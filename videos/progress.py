@@ -0,0 +1,118 @@
+"""
+Live progress of running conversions.
+
+run_ffmpeg_conversion passes FFmpeg's progress reports to a
+ConversionProgress, which publishes percent complete and encode speed per
+rendition to the cache (Redis), at most every PROGRESS_PUBLISH_INTERVAL
+seconds, and once more when the run ends. The processing endpoint combines
+them with the persistent RenditionState of every rendition; percent and
+speed are only shown while a rendition is running.
+"""
+import threading
+import time
+from django.core.cache import cache
+from .constants import PROGRESS_CACHE_KEY, PROGRESS_CACHE_TIMEOUT, PROGRESS_PUBLISH_INTERVAL
+from .models import RenditionState
+from .playback import RESOLUTION_ORDER
+
+
+class ConversionProgress:
+    """
+    Progress of one FFmpeg run encoding one or more renditions of a video.
+
+    Chunked conversions report every chunk as a separate part; positions and
+    speeds of the parts are summed, so percent covers the whole video and
+    speed is the combined throughput of all chunk processes.
+    """
+
+    def __init__(self, video, resolutions, clock=time.monotonic):
+        self.video_id = video.pk
+        self.duration = video.duration
+        self.resolutions = list(resolutions)
+        self.clock = clock
+        self._parts = {}
+        self._published_at = None
+        self._pending = False
+        self._lock = threading.Lock()
+
+    def update(self, out_time, speed, part=0):
+        """
+        Record a progress report, publishing it unless the last one was too recent.
+
+        Args:
+            out_time: Seconds of the output written so far
+            speed: Encode speed relative to real time, None if unknown
+            part: Chunk index for chunked conversions
+        """
+        with self._lock:
+            self._parts[part] = (out_time, speed)
+            self._pending = True
+            now = self.clock()
+            if self._published_at is not None and now - self._published_at < PROGRESS_PUBLISH_INTERVAL:
+                return
+            self._published_at = now
+            self._publish()
+
+    def flush(self):
+        """Publish the last report if throttling held it back; called when the run ends"""
+        with self._lock:
+            if self._pending:
+                self._published_at = self.clock()
+                self._publish()
+
+    def part(self, index):
+        """Progress callback for one chunk, for run_ffmpeg_conversion(on_progress=...)"""
+        return lambda out_time, speed: self.update(out_time, speed, part=index)
+
+    def _publish(self):
+        self._pending = False
+        out_time = sum(position for position, _ in self._parts.values())
+        speeds = [speed for _, speed in self._parts.values() if speed is not None]
+        progress = {
+            'percent': min(round(out_time / self.duration * 100, 1), 100.0) if self.duration else None,
+            'speed': round(sum(speeds), 2) if speeds else None,
+            'out_time': round(out_time, 1),
+            'updated_at': time.time(),
+        }
+        cache.set_many(
+            {_progress_key(self.video_id, resolution): progress for resolution in self.resolutions},
+            PROGRESS_CACHE_TIMEOUT
+        )
+
+
+def get_processing_status(video):
+    """
+    Conversion status of every rendition of a video.
+
+    Args:
+        video: Video instance
+
+    Returns:
+        dict: Video id and duration plus, per rendition, its status, attempts
+              and, while it is running, the last published percent complete
+              and encode speed
+    """
+    states = sorted(
+        RenditionState.objects.filter(video=video),
+        key=lambda state: RESOLUTION_ORDER.index(state.resolution)
+    )
+    live = cache.get_many([_progress_key(video.pk, state.resolution) for state in states])
+
+    renditions = []
+    for state in states:
+        # Reports of a finished, failed or not yet restarted run are stale
+        progress = live.get(_progress_key(video.pk, state.resolution), {}) if state.status == RenditionState.RUNNING else {}
+        renditions.append({
+            'resolution': state.resolution,
+            'status': state.status,
+            'attempts': state.attempts,
+            'percent': 100.0 if state.status == RenditionState.DONE else progress.get('percent'),
+            'speed': progress.get('speed'),
+            'updated_at': state.updated_at,
+        })
+
+    return {'id': video.pk, 'duration': video.duration, 'renditions': renditions}
+
+
+def _progress_key(video_id, resolution):
+    return PROGRESS_CACHE_KEY.format(video_id=video_id, resolution=resolution)
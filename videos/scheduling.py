@@ -0,0 +1,101 @@
+"""
+Shortest-job-first scheduling of encoding jobs.
+
+Every encoding job carries an estimated cost in its meta: seconds of
+source multiplied by the pixel count of its renditions relative to 1080p.
+RQ queues are FIFO, so a new job is moved in front of the first queued job
+with a higher cost. Short uploads therefore overtake feature-length ones
+instead of waiting behind them. Jobs without an estimate (unknown
+duration, or jobs enqueued elsewhere) are never overtaken and keep their
+place at the end.
+"""
+import logging
+from rq.job import Job
+from .constants import ENCODE_COST_META, ENCODE_COST_REFERENCE_HEIGHT
+
+logger = logging.getLogger(__name__)
+
+# Move a job in front of the pivot as one atomic step. A worker may dequeue
+# the job between the enqueue and the move; LREM then removes nothing and
+# the job must not be inserted again, or it would run twice. If the pivot
+# was dequeued meanwhile, so was everything before it, and the job goes to
+# the head of the queue.
+# Returns 0 if the job was no longer queued, 1 if it was moved before the
+# pivot, 2 if it was moved to the head.
+MOVE_JOB_SCRIPT = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 0 then
+    return 0
+end
+if redis.call('LINSERT', KEYS[1], 'BEFORE', ARGV[2], ARGV[1]) == -1 then
+    redis.call('LPUSH', KEYS[1], ARGV[1])
+    return 2
+end
+return 1
+"""
+
+
+def estimate_encode_cost(duration, heights):
+    """
+    Estimate the encoding cost of renditions of a source.
+
+    Args:
+        duration: Source duration in seconds, None if unknown
+        heights: Target heights of the renditions
+
+    Returns:
+        float: Seconds of 1080p-equivalent encoding, None if the duration is unknown
+    """
+    if not duration:
+        return None
+    return round(duration * sum((height / ENCODE_COST_REFERENCE_HEIGHT) ** 2 for height in heights), 1)
+
+
+def enqueue_shortest_first(queue, cost, func, *args, **kwargs):
+    """
+    Enqueue a job in front of every queued job with a higher estimated cost.
+
+    Args:
+        queue: RQ queue
+        cost: Estimated cost (see estimate_encode_cost), None to enqueue at the end
+        func, args, kwargs: As for Queue.enqueue
+
+    Returns:
+        Job: The enqueued job
+    """
+    job = queue.enqueue(func, *args, meta={ENCODE_COST_META: cost}, **kwargs)
+    # Jobs waiting for dependencies are not in the queue yet
+    if cost is None or not job.is_queued:
+        return job
+
+    queued = Job.fetch_many(queue.get_job_ids(), connection=queue.connection, serializer=queue.serializer)
+    pivot = find_insertion_pivot(queued, job.id, cost)
+    if pivot is None:
+        return job
+
+    move_job = queue.connection.register_script(MOVE_JOB_SCRIPT)
+    if move_job(keys=[queue.key], args=[job.id, pivot]):
+        logger.info(f"Scheduled job {job.id} (cost {cost}) before job {pivot} in {queue.name}")
+    return job
+
+
+def find_insertion_pivot(queued_jobs, job_id, cost):
+    """
+    Find the queued job a new job should be moved in front of.
+
+    Args:
+        queued_jobs: Jobs in queue order; None entries (expired jobs) are skipped
+        job_id: ID of the new job, itself part of queued_jobs
+        cost: Estimated cost of the new job
+
+    Returns:
+        str: ID of the first job with a higher estimated cost, None to stay in place
+    """
+    for queued in queued_jobs:
+        if queued is None:
+            continue
+        if queued.id == job_id:
+            return None
+        queued_cost = queued.meta.get(ENCODE_COST_META)
+        if queued_cost is not None and queued_cost > cost:
+            return queued.id
+    return None
@@ -0,0 +1,110 @@
+"""
+Full-text search for the video catalog.
+
+On PostgreSQL titles and descriptions are stored as a weighted tsvector
+(title = A, description = B) behind a GIN index and matched with prefix
+tsqueries. Other databases (e.g. the test database) use a pure-Python engine
+with the same tokenizing, prefix matching and weighting.
+"""
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from rest_framework import filters
+from .constants import SEARCH_CONFIG, SEARCH_RANK_FIELD, SEARCH_WEIGHTS
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def build_search_vector():
+    """Weighted tsvector expression over the searchable Video columns"""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+class PostgresSearchEngine:
+    """Ranks against the stored, GIN-indexed search_vector column"""
+
+    def update_index(self, video):
+        type(video).objects.filter(pk=video.pk).update(search_vector=build_search_vector())
+
+    def search(self, queryset, tokens):
+        query = SearchQuery(
+            ' & '.join(f'{token}:*' for token in tokens),
+            config=SEARCH_CONFIG,
+            search_type='raw'
+        )
+        # ts_rank returns real; cast to double precision so a rank read back
+        # from a cursor compares equal to the rank it was read from
+        return queryset.filter(search_vector=query).annotate(**{
+            SEARCH_RANK_FIELD: Cast(SearchRank(F('search_vector'), query, weights=SEARCH_WEIGHTS), FloatField())
+        })
+
+
+class PythonSearchEngine:
+    """Scans titles and descriptions in Python, only meant for small test databases"""
+
+    def update_index(self, video):
+        pass
+
+    def search(self, queryset, tokens):
+        ranks = {}
+        for pk, title, description in queryset.values_list('pk', 'title', 'description'):
+            rank = self._rank(tokens, tokenize(title), tokenize(description))
+            if rank:
+                ranks[pk] = rank
+
+        return queryset.filter(pk__in=ranks).annotate(**{
+            SEARCH_RANK_FIELD: Case(
+                *[When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()],
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+        })
+
+    def _rank(self, tokens, title_words, description_words):
+        """Weighted rank, or 0 unless every token prefixes a word in title or description"""
+        title_weight, description_weight = SEARCH_WEIGHTS[3], SEARCH_WEIGHTS[2]
+        rank = 0.0
+        for token in tokens:
+            if any(word.startswith(token) for word in title_words):
+                rank += title_weight
+            elif any(word.startswith(token) for word in description_words):
+                rank += description_weight
+            else:
+                return 0.0
+        return rank
+
+
+def get_search_engine(using='default'):
+    """Return the search engine matching the database vendor"""
+    if connections[using].vendor == 'postgresql':
+        return PostgresSearchEngine()
+    return PythonSearchEngine()
+
+
+class VideoSearchFilter(filters.SearchFilter):
+    """?search= backed by the full-text engine, annotating each match with its rank"""
+
+    def filter_queryset(self, request, queryset, view):
+        tokens = [token for term in self.get_search_terms(request) for token in tokenize(term)]
+        if not tokens:
+            return queryset
+        return get_search_engine(queryset.db).search(queryset, tokens)
+
+
+class SearchRankOrderingFilter(filters.OrderingFilter):
+    """Order search results by relevance unless the client asks for another ordering"""
+
+    def get_default_ordering(self, view):
+        if view.request.query_params.get(VideoSearchFilter.search_param):
+            return [f'-{SEARCH_RANK_FIELD}']
+        return super().get_default_ordering(view)
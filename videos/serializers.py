@@ -1,5 +1,134 @@
+import re
 from rest_framework import serializers
+from .constants import BATCH_MAX_VIDEOS, MAX_VIDEO_ID, SPARSE_FIELDS_PARAM, SPARSE_OMIT_PARAM
 from .models import Genre, Video, VideoFile
+from .signing import sign_media_url
+
+
+class SparseFieldsetMixin:
+    """Drop every field not listed in the serializer context's `fields` entry"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('fields')
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+def get_sparse_fields(query_params, serializer_class):
+    """
+    Resolve ?fields= and ?omit= against a serializer's fields
+    
+    Args:
+        query_params: Request query parameters
+        serializer_class: Serializer whose Meta.fields are selectable
+        
+    Returns:
+        list: Selected field names in serializer order, or None if neither parameter is given
+        
+    Raises:
+        ValidationError: If a parameter names an unknown field
+    """
+    requested = _split_param(query_params.get(SPARSE_FIELDS_PARAM))
+    omitted = _split_param(query_params.get(SPARSE_OMIT_PARAM))
+    if requested is None and omitted is None:
+        return None
+    
+    available = serializer_class.Meta.fields
+    unknown = [name for name in (requested or []) + (omitted or []) if name not in available]
+    if unknown:
+        raise serializers.ValidationError({
+            SPARSE_FIELDS_PARAM: f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}"
+        })
+    
+    return [
+        name for name in available
+        if (requested is None or name in requested) and name not in (omitted or [])
+    ]
+
+
+def get_batch_ids(query_params):
+    """
+    Parse ?ids= for the batch endpoint
+    
+    Args:
+        query_params: Request query parameters
+        
+    Returns:
+        list: Unique video ids in request order
+        
+    Raises:
+        ValidationError: If ids are missing, not decimal numbers, out of the id
+                         range or exceed BATCH_MAX_VIDEOS
+    """
+    names = _split_param(query_params.get('ids')) or []
+    # isdigit() also accepts characters like '²' that int() rejects
+    if not names or not all(re.fullmatch(r'[0-9]+', name) for name in names):
+        raise serializers.ValidationError({'ids': 'Provide a comma-separated list of video ids.'})
+    # The length check keeps int() away from its digit limit for absurd inputs
+    if any(len(name) > len(str(MAX_VIDEO_ID)) or int(name) > MAX_VIDEO_ID for name in names):
+        raise serializers.ValidationError({'ids': f'Video ids must not exceed {MAX_VIDEO_ID}.'})
+    
+    ids = list(dict.fromkeys(int(name) for name in names))
+    if len(ids) > BATCH_MAX_VIDEOS:
+        raise serializers.ValidationError({'ids': f'At most {BATCH_MAX_VIDEOS} ids per request.'})
+    return ids
+
+
+def group_videos_by_genre(videos_data):
+    """
+    Group serialized videos by genre name for the by_genre endpoint
+    
+    Args:
+        videos_data: VideoListSerializer data, ordered by genre
+        
+    Returns:
+        dict: {genre name: {'genre_id', 'genre_slug', 'videos'}}
+    """
+    result = {}
+    for video_data in videos_data:
+        genre = video_data['genre']
+        group = result.setdefault(genre['name'], {
+            'genre_id': genre['id'],
+            'genre_slug': genre['slug'],
+            'videos': []
+        })
+        group['videos'].append(video_data)
+    return result
+
+
+def finish_media_urls(data, request):
+    """
+    Make the media URLs of a detail payload absolute and signed for a request
+    
+    Args:
+        data: VideoDetailSerializer data serialized with `deferred_media_urls`
+              in its context, e.g. a payload cached for every host
+        request: Request the payload is returned for
+        
+    Returns:
+        dict: The payload as VideoDetailSerializer renders it with the request in its context
+    """
+    def absolute(url):
+        return request.build_absolute_uri(url) if url else url
+    
+    return {
+        **data,
+        'thumbnail': absolute(data['thumbnail']),
+        'preview_image': absolute(data['preview_image']),
+        'video_urls': {resolution: sign_media_url(url) for resolution, url in data['video_urls'].items()},
+        'video_files': [
+            {**video_file, 'file': absolute(sign_media_url(video_file['file']))}
+            for video_file in data['video_files']
+        ],
+    }
+
+
+def _split_param(value):
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
 
 class GenreSerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,14 +136,38 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug']
 
 
+class SignedFileField(serializers.FileField):
+    """
+    FileField rendering a signed URL for files that require one (see signing.py).
+    
+    With `deferred_media_urls` in the context the plain, relative URL is
+    rendered instead, see finish_media_urls().
+    
+    Catalog responses holding them are cached and validated per signing
+    window (see cache.get_catalog_validators), and MEDIA_SIGNED_URL_TTL is
+    checked to outlast the response cache (see checks.py).
+    """
+    
+    def to_representation(self, value):
+        if not value:
+            return None
+        if self.context.get('deferred_media_urls'):
+            return value.url
+        url = sign_media_url(value.url)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
 class VideoFileSerializer(serializers.ModelSerializer):
     """Serializer for VideoFile model"""
+    file = SignedFileField(read_only=True)
+    
     class Meta:
         model = VideoFile
         fields = ['id', 'resolution', 'file', 'file_size', 'width', 'height', 'bitrate', 'is_processed']
 
 
-class VideoListSerializer(serializers.ModelSerializer):
+class VideoListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for video list view (lighter data)"""
     genre = GenreSerializer(read_only=True)
     available_resolutions = serializers.ReadOnlyField()
@@ -28,7 +181,7 @@ class VideoListSerializer(serializers.ModelSerializer):
         ]
 
 
-class VideoDetailSerializer(serializers.ModelSerializer):
+class VideoDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for video detail view (complete data including video URLs)"""
     genre = GenreSerializer(read_only=True)
     available_resolutions = serializers.ReadOnlyField()
@@ -49,5 +202,6 @@ class VideoDetailSerializer(serializers.ModelSerializer):
         urls = {}
         for video_file in obj.files.all():
             if video_file.file:
-                urls[video_file.resolution] = video_file.file.url
+                url = video_file.file.url
+                urls[video_file.resolution] = url if self.context.get('deferred_media_urls') else sign_media_url(url)
         return urls
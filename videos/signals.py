@@ -2,14 +2,19 @@
 Signals for video file lifecycle events.
 
 On creation of an original VideoFile we enqueue HLS conversion; on deletion
-we remove the associated media file from disk.
+we remove the associated media file from disk. Any change to the catalog
+drops the cached API payloads once the transaction commits, and Video
+changes keep the featured pool and the search index in sync.
 """
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import VideoFile
+from .models import Genre, Video, VideoFile
 import os
-from .tasks import convert_video
-import django_rq
+from .cache import invalidate_catalog_cache, sync_featured_video
+from .playback import invalidate_playback_manifest
+from .search import get_search_engine
+from .tasks import enqueue_conversion
 
 @receiver(post_save, sender=VideoFile)
 def video_file_post_save(sender, instance, created, **kwargs):
@@ -19,9 +24,8 @@ def video_file_post_save(sender, instance, created, **kwargs):
     """
     if created and instance.resolution == 'original' and instance.file:
         print(f"New original video uploaded: {instance.video.title}")
-        # Enqueue conversion task asynchronously
-        queue = django_rq.get_queue('default')
-        job = queue.enqueue(convert_video, instance.id)
+        # Enqueue conversion jobs asynchronously
+        job = enqueue_conversion(instance.id)
         print(f"Conversion job enqueued: {job.id}")
 
 
@@ -33,3 +37,34 @@ def video_file_post_delete(sender, instance, **kwargs):
         if os.path.isfile(instance.file.path):
             os.remove(instance.file.path)
             print(f"Associated file for '{instance.video.title} - {instance.resolution}' has been deleted.")
+
+
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=Video)
+@receiver([post_save, post_delete], sender=VideoFile)
+def catalog_post_change(sender, **kwargs):
+    """Invalidate cached catalog payloads after the change is committed"""
+    transaction.on_commit(invalidate_catalog_cache)
+
+
+@receiver(post_save, sender=Video)
+def video_post_save(sender, instance, **kwargs):
+    """Refresh the search vector and add or remove the video from the featured pool"""
+    get_search_engine().update_index(instance)
+    video_id, is_featured = instance.id, instance.is_featured
+    transaction.on_commit(lambda: sync_featured_video(video_id, is_featured))
+
+
+@receiver(post_delete, sender=Video)
+def video_post_delete(sender, instance, **kwargs):
+    """Remove a deleted video from the featured pool"""
+    video_id = instance.id
+    transaction.on_commit(lambda: sync_featured_video(video_id, False))
+
+
+@receiver([post_save, post_delete], sender=Video)
+@receiver([post_save, post_delete], sender=VideoFile)
+def playback_post_change(sender, instance, **kwargs):
+    """Drop the cached playback manifest of the affected video"""
+    video_id = instance.pk if sender is Video else instance.video_id
+    transaction.on_commit(lambda: invalidate_playback_manifest(video_id))
@@ -0,0 +1,142 @@
+"""
+HMAC-signed, short-lived media URLs.
+
+Signed URLs carry the expiry and signature as path segments:
+
+    /media/signed/<expires>/<signature>/hls/720p/<name>/playlist.m3u8
+
+so relative segment URIs inside a playlist resolve to URLs that carry the
+same token. The signature covers a scope instead of a single file: for HLS
+output it is every rendition directory of the video (hls/*/<name>/), which
+also keeps the master playlist's ../../<res>/<name>/ references valid. Any
+other file is signed individually. Verification is a single HMAC and a
+constant-time comparison, without database or cache access.
+"""
+import hmac
+import math
+import posixpath
+import time
+from base64 import urlsafe_b64encode
+from hashlib import sha256
+from urllib.parse import quote, unquote
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from .constants import SIGNED_MEDIA_PREFIXES, SIGNED_URL_EXPIRY_GRANULARITY
+
+SIGNED_PATH_PREFIX = 'signed/'
+
+
+def normalize_media_path(path):
+    """
+    Normalise a requested media path before any access decision is made
+    
+    Args:
+        path: Path relative to MEDIA_URL, as taken from the request
+        
+    Returns:
+        str: Normalised path relative to MEDIA_ROOT, or None if the path has
+             '.' or '..' segments (and could name a different file than the
+             one a prefix or signature check looked at)
+    """
+    if any(segment in ('.', '..') for segment in path.replace('\\', '/').split('/')):
+        return None
+    path = posixpath.normpath('/' + path).lstrip('/')
+    return path if path not in ('', '.') else None
+
+
+def requires_signature(path):
+    """Whether a normalised media path is only served through signed URLs"""
+    return settings.MEDIA_SIGNED_URLS and path.lstrip('/').startswith(SIGNED_MEDIA_PREFIXES)
+
+
+def signing_scope(path):
+    """
+    Return the part of a media path covered by its signature
+    
+    Args:
+        path: Normalised media path relative to MEDIA_ROOT (see normalize_media_path)
+        
+    Returns:
+        str: 'hls/*/<name>/' for HLS output, the path itself otherwise
+    """
+    parts = path.lstrip('/').split('/')
+    if len(parts) >= 4 and parts[0] == 'hls':
+        return f'hls/*/{parts[2]}/'
+    return '/'.join(parts)
+
+
+def compute_signature(scope, expires):
+    digest = hmac.new(
+        settings.MEDIA_SIGNING_KEY.encode('utf-8'),
+        f'{expires}:{scope}'.encode('utf-8'),
+        sha256
+    ).digest()
+    return urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+def sign_media_url(url, now=None):
+    """
+    Turn an unsigned media URL into a signed one if its path requires it
+    
+    Args:
+        url: URL starting with MEDIA_URL, as returned by the storage
+        now: Current UNIX time, defaults to time.time()
+        
+    Returns:
+        str: Signed URL, or the URL unchanged if it needs no signature
+    """
+    if not url or not url.startswith(settings.MEDIA_URL):
+        return url
+    
+    path = normalize_media_path(unquote(url[len(settings.MEDIA_URL):]))
+    if path is None or not requires_signature(path):
+        return url
+    
+    now = time.time() if now is None else now
+    expires = math.ceil((now + settings.MEDIA_SIGNED_URL_TTL) / SIGNED_URL_EXPIRY_GRANULARITY)
+    expires *= SIGNED_URL_EXPIRY_GRANULARITY
+    signature = compute_signature(signing_scope(path), expires)
+    return f'{settings.MEDIA_URL}{SIGNED_PATH_PREFIX}{expires}/{signature}/{quote(path)}'
+
+
+def signing_window(now=None):
+    """
+    Return the expiry window URLs signed now belong to
+    
+    Responses holding signed URLs must not outlive their window in a cache
+    or behind a validator, see cache.get_catalog_validators().
+    
+    Args:
+        now: Current UNIX time, defaults to time.time()
+        
+    Returns:
+        int: Window number, or None while MEDIA_SIGNED_URLS is off
+    """
+    if not settings.MEDIA_SIGNED_URLS:
+        return None
+    now = time.time() if now is None else now
+    return math.ceil(now / SIGNED_URL_EXPIRY_GRANULARITY)
+
+
+def signing_window_start(window):
+    """UNIX time at which a signing window begins"""
+    return (window - 1) * SIGNED_URL_EXPIRY_GRANULARITY
+
+
+def verify_media_signature(path, expires, signature, now=None):
+    """
+    Check a signed media request
+    
+    Args:
+        path: Normalised media path relative to MEDIA_ROOT (see normalize_media_path)
+        expires: Expiry UNIX timestamp from the URL
+        signature: Signature from the URL
+        now: Current UNIX time, defaults to time.time()
+        
+    Returns:
+        bool: True if the signature matches and has not expired
+    """
+    now = time.time() if now is None else now
+    if int(expires) < now:
+        return False
+    return constant_time_compare(compute_signature(signing_scope(path), int(expires)), signature)
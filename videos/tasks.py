@@ -1,23 +1,71 @@
 """
 Background tasks for video processing: HLS conversion and preview generation.
 Triggered via RQ when an original VideoFile is saved.
+
+The stages run on separate queues, each with its own workers:
+- thumbnails: prepare_conversion probes the upload (analyze_source), picks
+  the part of RESOLUTION_CONFIGS the source can fill (build_effective_ladder),
+  generates the poster images and enqueues the encoding jobs.
+- fast-renditions: the lowest resolution, followed by a finalize job that
+  publishes it, so every upload becomes playable quickly.
+- heavy-renditions: all other resolutions, followed by a finalize job that
+  runs once all of them succeeded.
+Encoding jobs are ordered shortest job first by the probed duration (see
+scheduling.py).
+
+How the resolutions of a job are encoded depends on VIDEO_TRANSCODE_MODE:
+- single-pass: one FFmpeg process decodes the source once and feeds every
+  resolution through a split filter graph.
+- per-rendition: one job per resolution, so idle workers encode renditions
+  in parallel.
+- chunked: the source is cut at keyframes, the chunks are encoded in
+  parallel FFmpeg processes on the worker's machine, then the chunk
+  playlists of every resolution are stitched together.
+
+Renditions are checkpointed (see checkpoints.py), so re-running a job after
+a worker crash only encodes what is not finished yet.
 """
 import os
+import shutil
 import logging
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+import django_rq
+from django.conf import settings
 from django.core.files import File
-from .constants import RESOLUTION_CONFIGS
+from .checkpoints import checkpointed, mark_renditions, register_renditions
+from .constants import (
+    RESOLUTION_CONFIGS,
+    TRANSCODE_MODE_CHUNKED,
+    TRANSCODE_MODE_SINGLE_PASS,
+    THUMBNAIL_QUEUE,
+    FAST_RENDITION_QUEUE,
+    HEAVY_RENDITION_QUEUE
+)
+from .models import RenditionState
+from .progress import ConversionProgress
+from .scheduling import enqueue_shortest_first, estimate_encode_cost
 from .utils import (
     get_hls_output_paths,
     build_ffmpeg_hls_command,
     run_ffmpeg_conversion,
     calculate_hls_directory_size,
-    get_media_relative_path
+    get_media_relative_path,
+    stitch_hls_playlists,
+    clear_directory
 )
 from .functions import (
     check_resolution_exists,
+    analyze_source,
+    build_effective_ladder,
     prepare_conversion_command,
+    prepare_multi_conversion_command,
+    get_chunk_work_dir,
+    split_into_chunks,
+    prepare_chunk_conversion_command,
     create_video_file_entry,
+    create_master_playlist,
     generate_thumbnail,
     generate_preview_image
 )
@@ -25,62 +73,356 @@ from .functions import (
 logger = logging.getLogger(__name__)
 
 
-def convert_video(original_video_file_id):
+def enqueue_conversion(original_video_file_id):
     """
-    Convert the original video to multiple HLS resolutions
+    Enqueue the conversion of an original VideoFile
+    
+    Only prepare_conversion is enqueued here; it probes the upload and then
+    enqueues the encoding jobs.
     
     Args:
         original_video_file_id: ID of VideoFile instance with resolution='original'
+        
+    Returns:
+        Job: The prepare_conversion job
+    """
+    return django_rq.get_queue(THUMBNAIL_QUEUE).enqueue(prepare_conversion, original_video_file_id)
+
+
+def prepare_conversion(original_video_file_id):
+    """
+    Probe an upload, generate its thumbnail and preview image and enqueue its encoding jobs
+    
+    The lowest resolution is encoded on the fast-renditions queue and
+    published on its own, so the upload becomes playable quickly. The other
+    resolutions go to heavy-renditions, followed by a finalize_conversion
+    job that runs once all of them succeeded.
+    
+    Returns:
+        Job: The finalize_conversion job that runs last, None if the upload was deleted
+    """
+    loaded = _load_original(original_video_file_id)
+    if loaded is None:
+        return None
+    original_video_file, source_path, base_name = loaded
+    video = original_video_file.video
+    
+    ladder = build_effective_ladder(analyze_source(original_video_file, source_path))
+    register_renditions(video, [config[0] for config in ladder])
+    if not video.thumbnail or not video.preview_image:
+        _generate_thumbnails(video, source_path, base_name)
+    
+    lowest = min(ladder, key=lambda config: config[1])
+    fast_queue = django_rq.get_queue(FAST_RENDITION_QUEUE)
+    first_jobs = _enqueue_encoding(FAST_RENDITION_QUEUE, original_video_file_id, [lowest], video.duration)
+    playable_job = fast_queue.enqueue(finalize_conversion, original_video_file_id, depends_on=first_jobs)
+    
+    heavy_jobs = _enqueue_encoding(
+        HEAVY_RENDITION_QUEUE,
+        original_video_file_id,
+        [config for config in ladder if config is not lowest],
+        video.duration
+    )
+    if not heavy_jobs:
+        return playable_job
+    return fast_queue.enqueue(finalize_conversion, original_video_file_id, depends_on=[*heavy_jobs, playable_job])
+
+
+def _enqueue_encoding(queue_name, original_video_file_id, configs, duration):
+    """
+    Enqueue the jobs encoding some resolutions of an upload, shortest job first
+    
+    Per-rendition mode gets one convert_rendition job per resolution, the
+    other modes one convert_renditions job for all of them.
+    
+    Returns:
+        list: The enqueued jobs
+    """
+    if not configs:
+        return []
+    queue = django_rq.get_queue(queue_name)
+    
+    if settings.VIDEO_TRANSCODE_MODE not in (TRANSCODE_MODE_SINGLE_PASS, TRANSCODE_MODE_CHUNKED):
+        return [
+            enqueue_shortest_first(
+                queue, estimate_encode_cost(duration, [height]), convert_rendition, original_video_file_id, resolution
+            )
+            for resolution, height, *_ in configs
+        ]
+    
+    options = {}
+    queue_timeout = settings.RQ_QUEUES.get(queue_name, {}).get('DEFAULT_TIMEOUT') or 0
+    if settings.VIDEO_TRANSCODE_MODE == TRANSCODE_MODE_CHUNKED and settings.VIDEO_CHUNKED_JOB_TIMEOUT > queue_timeout:
+        # Only ever extend the queue's limit, heavy-renditions allows longer
+        options['job_timeout'] = settings.VIDEO_CHUNKED_JOB_TIMEOUT
+    return [enqueue_shortest_first(
+        queue,
+        estimate_encode_cost(duration, [height for _, height, *_ in configs]),
+        convert_renditions,
+        original_video_file_id,
+        [config[0] for config in configs],
+        **options
+    )]
+
+
+def convert_rendition(original_video_file_id, resolution):
+    """
+    Convert an upload to one HLS resolution
+    
+    Raises:
+        RuntimeError: If FFmpeg fails, so the job fails and finalize_conversion
+                      (which depends on it) is not started
+    """
+    loaded = _load_original(original_video_file_id)
+    if loaded is None:
+        return
+    original_video_file, source_path, base_name = loaded
+    
+    ladder = build_effective_ladder(analyze_source(original_video_file, source_path))
+    config = next((config for config in ladder if config[0] == resolution), None)
+    if config is None:
+        logger.info(f"{resolution} exceeds the source of VideoFile {original_video_file_id}, skipping...")
+        return
+    _, height, video_bitrate, audio_bitrate = config
+    if not _convert_to_resolution(
+        original_video_file, source_path, base_name, resolution, height, video_bitrate, audio_bitrate
+    ):
+        raise RuntimeError(f"Conversion to {resolution} failed for VideoFile {original_video_file_id}")
+
+
+def convert_renditions(original_video_file_id, resolutions):
+    """
+    Convert an upload to several HLS resolutions in one job (single-pass or chunked mode)
+    
+    Raises:
+        RuntimeError: If a resolution is missing afterwards, so the
+                      finalize_conversion jobs depending on it are not started
+    """
+    loaded = _load_original(original_video_file_id)
+    if loaded is None:
+        return
+    original_video_file, source_path, base_name = loaded
+    video = original_video_file.video
+    
+    ladder = [
+        config for config in build_effective_ladder(analyze_source(original_video_file, source_path))
+        if config[0] in resolutions
+    ]
+    if settings.VIDEO_TRANSCODE_MODE == TRANSCODE_MODE_CHUNKED:
+        _convert_chunked(original_video_file, source_path, base_name, ladder)
+    else:
+        _convert_single_pass(original_video_file, source_path, base_name, ladder)
+    
+    missing = [config[0] for config in ladder if not check_resolution_exists(video, config[0])]
+    if missing:
+        raise RuntimeError(f"Conversion to {', '.join(missing)} failed for VideoFile {original_video_file_id}")
+
+
+def finalize_conversion(original_video_file_id):
+    """
+    Publish the renditions of an upload once their jobs succeeded: write the
+    master playlist (which makes adaptive playback the default) and log the
+    storage used by the renditions.
     """
     from .models import VideoFile
     
-    # Get the VideoFile instance
-    try:
-        original_video_file = VideoFile.objects.get(id=original_video_file_id)
-    except VideoFile.DoesNotExist:
-        logger.error(f"VideoFile with ID {original_video_file_id} does not exist")
+    loaded = _load_original(original_video_file_id)
+    if loaded is None:
         return
+    original_video_file, source_path, base_name = loaded
+    video = original_video_file.video
     
-    source_path = original_video_file.file.path
-    base_name = os.path.splitext(os.path.basename(source_path))[0]
+    create_master_playlist(video, source_path, base_name)
+    total_size = sum(
+        VideoFile.objects.filter(
+            video=video,
+            resolution__in=[name for name, *_ in RESOLUTION_CONFIGS]
+        ).values_list('file_size', flat=True)
+    )
+    logger.info(f"Finished conversion of {video.title}: {total_size} bytes of HLS renditions")
+
+
+def convert_video(original_video_file_id):
+    """
+    Convert the original video to multiple HLS resolutions and write the
+    adaptive master playlist over them, all in one job (e.g. to convert an
+    upload by hand; enqueue_conversion splits this over several queues)
+    
+    Args:
+        original_video_file_id: ID of VideoFile instance with resolution='original'
+    """
+    loaded = _load_original(original_video_file_id)
+    if loaded is None:
+        return
+    original_video_file, source_path, base_name = loaded
     
     # Generate thumbnails if not already present
     if not original_video_file.video.thumbnail or not original_video_file.video.preview_image:
         _generate_thumbnails(original_video_file.video, source_path, base_name)
     
-    for resolution_name, height, video_bitrate, audio_bitrate in RESOLUTION_CONFIGS:
-        _convert_to_resolution(
-            original_video_file,
+    ladder = build_effective_ladder(analyze_source(original_video_file, source_path))
+    register_renditions(original_video_file.video, [config[0] for config in ladder])
+    if settings.VIDEO_TRANSCODE_MODE == TRANSCODE_MODE_SINGLE_PASS:
+        _convert_single_pass(original_video_file, source_path, base_name, ladder)
+    elif settings.VIDEO_TRANSCODE_MODE == TRANSCODE_MODE_CHUNKED:
+        _convert_chunked(original_video_file, source_path, base_name, ladder)
+    else:
+        for resolution_name, height, video_bitrate, audio_bitrate in ladder:
+            _convert_to_resolution(
+                original_video_file,
+                source_path,
+                base_name,
+                resolution_name,
+                height,
+                video_bitrate,
+                audio_bitrate
+            )
+    
+    create_master_playlist(original_video_file.video, source_path, base_name)
+
+
+def _convert_to_resolution(original_video_file, source_path, base_name, resolution, height, video_bitrate, audio_bitrate):
+    """
+    Convert video to specific resolution using FFmpeg and HLS.
+    
+    Returns:
+        bool: True if the resolution exists afterwards
+    """
+    video = original_video_file.video
+    if check_resolution_exists(video, resolution):
+        logger.info(f"{resolution} already exists, skipping...")
+        return True
+    
+    with checkpointed(video, [resolution]) as claimed:
+        if not claimed:
+            return False
+        
+        command, hls_dir, playlist_path, segment_pattern = prepare_conversion_command(
             source_path,
+            resolution,
             base_name,
-            resolution_name,
             height,
             video_bitrate,
             audio_bitrate
         )
+        clear_directory(hls_dir)  # Partial output of an interrupted attempt
+        
+        progress = ConversionProgress(video, claimed)
+        succeeded = run_ffmpeg_conversion(command, resolution, video.title, progress.update)
+        progress.flush()
+        if not succeeded:
+            return False
+        if not create_video_file_entry(video, resolution, playlist_path, hls_dir):
+            return False
+        mark_renditions(video, claimed, RenditionState.DONE)
+        return True
 
 
-def _convert_to_resolution(original_video_file, source_path, base_name, resolution, height, video_bitrate, audio_bitrate):
+def _convert_single_pass(original_video_file, source_path, base_name, ladder=RESOLUTION_CONFIGS):
     """
-    Convert video to specific resolution using FFmpeg and HLS.
+    Convert all missing resolutions of the ladder with one FFmpeg process that decodes the source once.
     """
-    if check_resolution_exists(original_video_file.video, resolution):
-        logger.info(f"{resolution} already exists, skipping...")
+    video = original_video_file.video
+    configs = [
+        config for config in ladder
+        if not check_resolution_exists(video, config[0])
+    ]
+    if not configs:
+        logger.info("All resolutions already exist, skipping...")
         return
     
-    command, hls_dir, playlist_path, segment_pattern = prepare_conversion_command(
-        source_path,
-        resolution,
-        base_name,
-        height,
-        video_bitrate,
-        audio_bitrate
-    )
+    with checkpointed(video, [config[0] for config in configs]) as claimed:
+        configs = [config for config in configs if config[0] in claimed]
+        if not configs:
+            return
+        
+        command, renditions = prepare_multi_conversion_command(source_path, base_name, configs)
+        for _, hls_dir, _ in renditions:
+            clear_directory(hls_dir)
+        progress = ConversionProgress(video, claimed)
+        succeeded = run_ffmpeg_conversion(command, ', '.join(claimed), video.title, progress.update)
+        progress.flush()
+        if not succeeded:
+            return
+        
+        for resolution, hls_dir, playlist_path in renditions:
+            if create_video_file_entry(video, resolution, playlist_path, hls_dir):
+                mark_renditions(video, [resolution], RenditionState.DONE)
+
+
+def _convert_chunked(original_video_file, source_path, base_name, ladder=RESOLUTION_CONFIGS):
+    """
+    Convert all missing resolutions of the ladder from keyframe-aligned chunks of the source.
     
-    if not run_ffmpeg_conversion(command, resolution, original_video_file.video.title):
+    Each chunk is encoded by its own FFmpeg process (decoding the chunk once
+    for all resolutions), up to VIDEO_CHUNK_WORKERS at a time. A resolution
+    is only recorded once every chunk succeeded; the work directory is
+    removed either way.
+    """
+    video = original_video_file.video
+    configs = [
+        config for config in ladder
+        if not check_resolution_exists(video, config[0])
+    ]
+    if not configs:
+        logger.info("All resolutions already exist, skipping...")
         return
     
-    create_video_file_entry(original_video_file.video, resolution, playlist_path, hls_dir)
+    work_dir = get_chunk_work_dir(source_path, base_name)
+    with checkpointed(video, [config[0] for config in configs]) as claimed:
+        configs = [config for config in configs if config[0] in claimed]
+        if not configs:
+            return
+        
+        try:
+            shutil.rmtree(work_dir, ignore_errors=True)  # Chunks of an interrupted attempt
+            chunks = split_into_chunks(source_path, work_dir, video.title)
+            if not chunks:
+                return
+            
+            commands, chunk_playlists = zip(*(
+                prepare_chunk_conversion_command(chunk_path, work_dir, index, configs)
+                for index, chunk_path in enumerate(chunks)
+            ))
+            labels = [f"chunk {index + 1}/{len(chunks)}" for index in range(len(chunks))]
+            progress = ConversionProgress(video, claimed)
+            callbacks = [progress.part(index) for index in range(len(chunks))]
+            # The threads only wait on the FFmpeg processes doing the encoding
+            with ThreadPoolExecutor(max_workers=settings.VIDEO_CHUNK_WORKERS) as pool:
+                results = list(pool.map(run_ffmpeg_conversion, commands, labels, repeat(video.title), callbacks))
+            progress.flush()
+            if not all(results):
+                logger.error(f"{results.count(False)} of {len(chunks)} chunks failed for {video.title}")
+                return
+            
+            for resolution, *_ in configs:
+                hls_dir, _, _ = get_hls_output_paths(source_path, resolution, base_name)
+                clear_directory(hls_dir)
+                playlist_path = stitch_hls_playlists([playlists[resolution] for playlists in chunk_playlists], hls_dir)
+                if create_video_file_entry(video, resolution, playlist_path, hls_dir):
+                    mark_renditions(video, [resolution], RenditionState.DONE)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _load_original(original_video_file_id):
+    """
+    Load an original VideoFile for a job.
+    
+    Returns:
+        tuple: (original_video_file, source_path, base_name), or None if it was deleted
+    """
+    from .models import VideoFile
+    
+    try:
+        original_video_file = VideoFile.objects.select_related('video').get(id=original_video_file_id)
+    except VideoFile.DoesNotExist:
+        logger.error(f"VideoFile with ID {original_video_file_id} does not exist")
+        return None
+    
+    source_path = original_video_file.file.path
+    base_name = os.path.splitext(os.path.basename(source_path))[0]
+    return original_video_file, source_path, base_name
 
 
 def _create_video_file_entry(video, resolution, playlist_path, hls_dir):
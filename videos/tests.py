@@ -1,9 +1,58 @@
 """API tests for video listing, detail, genre grouping, and featured endpoints."""
 
-from django.test import TestCase
+from django.conf import settings
+import gzip
+from base64 import urlsafe_b64encode
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+from urllib.parse import quote, unquote
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth import get_user_model
-from .models import Genre, Video
+from .cache import get_response_cache_stats
+from .checks import check_media_signing
+from .checkpoints import checkpointed, claim_renditions, find_resumable_videos
+from .models import Genre, RenditionState, Video, VideoFile
+from .progress import ConversionProgress
+from .search import PostgresSearchEngine, PythonSearchEngine
+from .media import parse_range_header
+from .media_cache import MediaFileCache, media_file_cache
+from .middleware import SUPPORTED_ENCODINGS, compress, negotiate_encoding
+from .renderers import FastJSONParser, FastJSONRenderer
+from .signing import sign_media_url
+from .constants import RESOLUTION_CONFIGS
+from .functions import analyze_source, build_effective_ladder
+from .scheduling import MOVE_JOB_SCRIPT, enqueue_shortest_first, estimate_encode_cost, find_insertion_pivot
+from .tasks import (
+	_convert_chunked, _convert_single_pass, _enqueue_encoding, convert_rendition, convert_renditions, enqueue_conversion,
+	finalize_conversion, prepare_conversion
+)
+from .utils import (
+	build_codecs_string, build_ffmpeg_multi_hls_command, build_master_playlist, measure_hls_bandwidth,
+	parse_ffmpeg_progress, parse_hls_playlist, run_ffmpeg_conversion, stitch_hls_playlists
+)
 
 
 User = get_user_model()
@@ -13,6 +62,7 @@ class VideoApiTest(TestCase):
 	"""Ensure authenticated users can read video endpoints."""
 
 	def setUp(self):
+		cache.clear()
 		self.client = APIClient()
 		self.user = User.objects.create_user(email='viewer@example.com', password='Test1234!', is_active=True)
 		self.client.force_authenticate(user=self.user)
@@ -28,8 +78,8 @@ class VideoApiTest(TestCase):
 	def test_list_videos(self):
 		response = self.client.get('/api/videos/')
 		self.assertEqual(response.status_code, 200)
-		self.assertGreaterEqual(len(response.json()), 1)
-		self.assertEqual(response.json()[0]['title'], self.video.title)
+		self.assertGreaterEqual(len(response.json()['results']), 1)
+		self.assertEqual(response.json()['results'][0]['title'], self.video.title)
 
 	def test_detail_video(self):
 		response = self.client.get(f'/api/videos/{self.video.id}/')
@@ -47,3 +97,1451 @@ class VideoApiTest(TestCase):
 		response = self.client.get('/api/videos/featured/')
 		self.assertEqual(response.status_code, 200)
 		self.assertEqual(response.json()['id'], self.video.id)
+
+
+class VideoQueryCountTest(TestCase):
+	"""List and detail endpoints must not issue queries per video row."""
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='counter@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+
+		genres = [Genre.objects.create(name=f'Genre {i}', slug=f'genre-{i}') for i in range(5)]
+		videos = Video.objects.bulk_create([
+			Video(title=f'Video {i}', description='Desc', genre=genres[i % len(genres)])
+			for i in range(300)
+		])
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution=resolution, file=f'videos/{video.id}/{resolution}.m3u8', file_size=1)
+			for video in videos
+			for resolution in ('original', '720p', '360p')
+		])
+		self.video = videos[0]
+
+	def test_list_query_count_is_constant(self):
+		# One query for videos joined with genres, one for the prefetched files
+		with self.assertNumQueries(2):
+			response = self.client.get('/api/videos/?page_size=100')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(len(response.json()['results']), 100)
+		self.assertEqual(response.json()['results'][0]['available_resolutions'], ['360p', '720p', 'original'])
+
+	def test_detail_query_count_is_constant(self):
+		with self.assertNumQueries(2):
+			response = self.client.get(f'/api/videos/{self.video.id}/')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(set(response.json()['video_urls']), {'original', '720p', '360p'})
+
+
+class SparseFieldsetTest(TestCase):
+	"""?fields= / ?omit= trim the payload and the SQL behind it."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='sparse@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+		genre = Genre.objects.create(name='Action', slug='action')
+		videos = Video.objects.bulk_create([
+			Video(title=f'Video {i}', description='Long description', genre=genre) for i in range(30)
+		])
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='720p', file=f'videos/{video.id}/720p.m3u8', file_size=1)
+			for video in videos
+		])
+		self.video = videos[0]
+
+	def test_fields_prune_payload_and_query(self):
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get('/api/videos/?fields=id,title,thumbnail')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(set(response.json()['results'][0]), {'id', 'title', 'thumbnail'})
+		self.assertEqual(len(queries), 1)
+		self.assertNotIn('description', queries[0]['sql'])
+		self.assertNotIn('videos_genre', queries[0]['sql'])
+
+	def test_omit_keeps_relations_that_are_still_rendered(self):
+		with self.assertNumQueries(2):
+			response = self.client.get('/api/videos/?omit=description,preview_image')
+		result = response.json()['results'][0]
+		self.assertNotIn('description', result)
+		self.assertEqual(result['genre']['slug'], 'action')
+		self.assertEqual(result['available_resolutions'], ['720p'])
+
+	def test_detail_fields_and_pagination(self):
+		response = self.client.get(f'/api/videos/{self.video.id}/?fields=title,video_urls')
+		self.assertEqual(response.json(), {'title': 'Video 0', 'video_urls': {'720p': '/media/videos/%d/720p.m3u8' % self.video.id}})
+
+		first = self.client.get('/api/videos/?fields=id&ordering=title&page_size=20').json()
+		second = self.client.get(first['next']).json()
+		self.assertEqual(len(first['results']) + len(second['results']), 30)
+
+	def test_unknown_field_is_rejected(self):
+		response = self.client.get('/api/videos/?fields=id,secret')
+		self.assertEqual(response.status_code, 400)
+
+
+class VideoBatchTest(TestCase):
+	"""batch returns many video details in request order with one set of queries."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='batch@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+		genre = Genre.objects.create(name='Action', slug='action')
+		self.videos = Video.objects.bulk_create([
+			Video(title=f'Video {i}', description='Desc', genre=genre) for i in range(5)
+		])
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='720p', file=f'videos/{video.id}/720p.m3u8', file_size=1)
+			for video in self.videos
+		])
+
+	def test_preserves_order_in_constant_queries(self):
+		ids = [self.videos[3].id, self.videos[0].id, 999999, self.videos[3].id, self.videos[4].id]
+		with self.assertNumQueries(2):
+			response = self.client.get(f"/api/videos/batch/?ids={','.join(map(str, ids))}")
+		body = response.json()
+		self.assertEqual([video['id'] for video in body['results']], [ids[0], ids[1], ids[4]])
+		self.assertEqual(body['results'][0]['video_urls'], {'720p': f'/media/videos/{ids[0]}/720p.m3u8'})
+		self.assertEqual(body['not_found'], [999999])
+
+	def test_supports_sparse_fields(self):
+		response = self.client.get(f'/api/videos/batch/?ids={self.videos[0].id}&fields=id,title')
+		self.assertEqual(response.json()['results'], [{'id': self.videos[0].id, 'title': 'Video 0'}])
+
+	def test_rejects_invalid_or_oversized_batches(self):
+		self.assertEqual(self.client.get('/api/videos/batch/').status_code, 400)
+		self.assertEqual(self.client.get('/api/videos/batch/?ids=1,abc').status_code, 400)
+		self.assertEqual(self.client.get('/api/videos/batch/?ids=1,²').status_code, 400)
+		self.assertEqual(self.client.get(f'/api/videos/batch/?ids=1,{2**63}').status_code, 400)
+		self.assertEqual(self.client.get(f"/api/videos/batch/?ids=1,{'9' * 5000}").status_code, 400)
+		too_many = ','.join(str(pk) for pk in range(1, 52))
+		self.assertEqual(self.client.get(f'/api/videos/batch/?ids={too_many}').status_code, 400)
+
+
+class VideosByGenreTest(TestCase):
+	"""by_genre returns the top videos per genre and caches the payload."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='genres@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+
+		self.genres = [Genre.objects.create(name=f'Genre {i}', slug=f'genre-{i}') for i in range(3)]
+		Video.objects.bulk_create([
+			Video(title=f'{genre.name} Video {i}', description='Desc', genre=genre)
+			for genre in self.genres
+			for i in range(15)
+		])
+
+	def test_returns_top_ten_newest_per_genre(self):
+		with self.assertNumQueries(2):
+			response = self.client.get('/api/videos/by_genre/')
+		self.assertEqual(response.status_code, 200)
+		body = response.json()
+		self.assertEqual(list(body), [genre.name for genre in self.genres])
+		for genre in self.genres:
+			expected = list(genre.videos.order_by('-created_at', '-id').values_list('id', flat=True)[:10])
+			self.assertEqual([video['id'] for video in body[genre.name]['videos']], expected)
+			self.assertEqual(body[genre.name]['genre_slug'], genre.slug)
+
+	def test_payload_is_cached_until_catalog_changes(self):
+		self.client.get('/api/videos/by_genre/')
+		with self.assertNumQueries(0):
+			self.client.get('/api/videos/by_genre/')
+
+		with self.captureOnCommitCallbacks(execute=True):
+			Genre.objects.create(name='Drama', slug='drama')
+			Video.objects.create(title='New Drama', description='Desc', genre=Genre.objects.get(slug='drama'))
+
+		body = self.client.get('/api/videos/by_genre/').json()
+		self.assertEqual(body['Drama']['videos'][0]['title'], 'New Drama')
+
+	def test_cached_links_belong_to_the_requested_host(self):
+		Video.objects.filter(genre=self.genres[0]).update(thumbnail='thumbnails/poster.jpg')
+		for host in ('localhost', '127.0.0.1', 'localhost'):
+			with self.subTest(host=host):
+				body = self.client.get('/api/videos/by_genre/', HTTP_HOST=host).json()
+				self.assertTrue(body['Genre 0']['videos'][0]['thumbnail'].startswith(f'http://{host}/media/'))
+
+
+class FeaturedVideoPoolTest(TestCase):
+	"""featured picks from the cached pool and only touches the chosen row."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='hero@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+		self.genre = Genre.objects.create(name='Action', slug='action')
+
+		with self.captureOnCommitCallbacks(execute=True):
+			Video.objects.create(title='Plain', description='Desc', genre=self.genre)
+			self.featured = [
+				Video.objects.create(title=f'Hero {i}', description='Desc', genre=self.genre, is_featured=True)
+				for i in range(3)
+			]
+
+	def test_returns_only_featured_videos(self):
+		featured_ids = {video.id for video in self.featured}
+		for _ in range(10):
+			response = self.client.get('/api/videos/featured/')
+			self.assertEqual(response.status_code, 200)
+			self.assertIn(response.json()['id'], featured_ids)
+
+	def test_cached_payload_needs_no_queries(self):
+		# Warm every payload in the pool, then picks are served from cache
+		seen = set()
+		while len(seen) < len(self.featured):
+			seen.add(self.client.get('/api/videos/featured/').json()['id'])
+		with self.assertNumQueries(0):
+			self.client.get('/api/videos/featured/')
+
+	def test_unfeaturing_removes_video_from_pool(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			for video in self.featured[1:]:
+				video.is_featured = False
+				video.save()
+		for _ in range(5):
+			self.assertEqual(self.client.get('/api/videos/featured/').json()['id'], self.featured[0].id)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.featured[0].delete()
+		self.assertEqual(self.client.get('/api/videos/featured/').status_code, 404)
+
+	@override_settings(MEDIA_SIGNED_URLS=True)
+	def test_cached_payload_links_are_finished_per_request(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			for video in self.featured[1:]:
+				video.is_featured = False
+				video.save()
+		hero = self.featured[0]
+		Video.objects.filter(pk=hero.pk).update(thumbnail='thumbnails/hero.jpg')
+		VideoFile.objects.bulk_create([
+			VideoFile(video=hero, resolution='720p', file='hls/720p/hero/playlist.m3u8', file_size=4),
+		])
+
+		first = self.client.get('/api/videos/featured/', HTTP_HOST='localhost').json()
+		# A later signing window, while the cached payload is still fresh
+		with patch('videos.signing.time.time', return_value=time.time() + 10 * 60):
+			later = self.client.get('/api/videos/featured/', HTTP_HOST='127.0.0.1').json()
+			detail = self.client.get(f'/api/videos/{hero.id}/', HTTP_HOST='127.0.0.1').json()
+
+		self.assertTrue(first['thumbnail'].startswith('http://localhost/media/'))
+		self.assertEqual(later, detail)
+		self.assertNotEqual(later['video_urls']['720p'], first['video_urls']['720p'])
+		self.assertTrue(later['video_files'][0]['file'].startswith('http://127.0.0.1/media/signed/'))
+
+
+class VideoKeysetPaginationTest(TestCase):
+	"""Cursor pages walk the catalog in order without gaps or duplicates."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='pager@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+
+		genre = Genre.objects.create(name='Action', slug='action')
+		# Few distinct titles and years, some years missing, to exercise ties and NULLs
+		Video.objects.bulk_create([
+			Video(
+				title=f'Title {i % 7}',
+				description='Desc',
+				genre=genre,
+				release_year=None if i % 5 == 0 else 2000 + i % 4,
+			)
+			for i in range(53)
+		])
+
+	def _walk(self, url):
+		ids = []
+		while url:
+			body = self.client.get(url).json()
+			ids.extend(video['id'] for video in body['results'])
+			url = body['next']
+		return ids
+
+	def test_pages_follow_each_ordering(self):
+		expected = {
+			'-created_at': Video.objects.order_by('-created_at', '-id'),
+			'title': Video.objects.order_by('title', 'id'),
+			'-title': Video.objects.order_by('-title', '-id'),
+			'release_year': Video.objects.order_by(F('release_year').asc(nulls_last=True), 'id'),
+			'-release_year': Video.objects.order_by(F('release_year').desc(nulls_first=True), '-id'),
+		}
+		for ordering, queryset in expected.items():
+			with self.subTest(ordering=ordering):
+				ids = self._walk(f'/api/videos/?ordering={ordering}&page_size=5')
+				self.assertEqual(ids, list(queryset.values_list('id', flat=True)))
+
+	def test_previous_link_returns_to_prior_page(self):
+		first = self.client.get('/api/videos/?ordering=release_year&page_size=10').json()
+		second = self.client.get(first['next']).json()
+		back = self.client.get(second['previous']).json()
+		self.assertEqual([v['id'] for v in back['results']], [v['id'] for v in first['results']])
+
+	def test_page_size_is_capped(self):
+		response = self.client.get('/api/videos/?page_size=100000')
+		self.assertEqual(len(response.json()['results']), min(53, settings.CATALOG_MAX_PAGE_SIZE))
+
+	def test_invalid_cursor_returns_404(self):
+		response = self.client.get('/api/videos/?cursor=not-a-cursor')
+		self.assertEqual(response.status_code, 404)
+
+	def test_cursor_values_of_the_wrong_type_return_404(self):
+		for position in (
+			['abc', 'x'],
+			[{'a': 1}, 1],
+			['2020-01-01T00:00:00', 'notanint'],
+			['2020-01-01T00:00:00+00:00', 99999999999999999999],
+		):
+			cursor = urlsafe_b64encode(json.dumps({'p': position}).encode()).decode()
+			with self.subTest(position=position):
+				self.assertEqual(self.client.get(f'/api/videos/?cursor={cursor}').status_code, 404)
+
+
+class VideoSearchTest(TestCase):
+	"""?search= matches word prefixes in all terms and ranks title hits first."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='seeker@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+
+		genre = Genre.objects.create(name='Action', slug='action')
+		self.description_hit = Video.objects.create(
+			title='Night Shift', description='A dragon hunts the city', genre=genre
+		)
+		self.title_hit = Video.objects.create(
+			title='Dragon Rider', description='Flying over mountains', genre=genre
+		)
+		Video.objects.create(title='Ocean Deep', description='Submarine drama', genre=genre)
+
+	def _search(self, term, **params):
+		response = self.client.get('/api/videos/', {'search': term, **params})
+		self.assertEqual(response.status_code, 200)
+		return [video['id'] for video in response.json()['results']]
+
+	def test_title_matches_rank_above_description_matches(self):
+		self.assertEqual(self._search('drag'), [self.title_hit.id, self.description_hit.id])
+
+	def test_all_terms_must_match(self):
+		self.assertEqual(self._search('dragon city'), [self.description_hit.id])
+		self.assertEqual(self._search('dragon submarine'), [])
+
+	def test_explicit_ordering_overrides_rank(self):
+		self.assertEqual(
+			self._search('dragon', ordering='-title'),
+			[self.description_hit.id, self.title_hit.id]
+		)
+
+	def test_ranked_results_paginate(self):
+		first = self.client.get('/api/videos/', {'search': 'dragon', 'page_size': 1}).json()
+		second = self.client.get(first['next']).json()
+		self.assertEqual(
+			[first['results'][0]['id'], second['results'][0]['id']],
+			[self.title_hit.id, self.description_hit.id]
+		)
+		self.assertIsNone(second['next'])
+
+	def test_postgres_rank_is_compared_in_double_precision(self):
+		postgres = PostgresDatabaseWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'}, alias='postgres')
+		queryset = PostgresSearchEngine().search(Video.objects.all(), ['drag'])
+
+		sql, _ = queryset.query.get_compiler(connection=postgres).as_sql()
+		self.assertRegex(sql, r'\(ts_rank\(.*\)\)::double precision AS "search_rank"')
+
+	def test_float4_ranks_paginate(self):
+		# ts_rank values are real (float4), widened to double by the annotation
+		float4 = lambda value: struct.unpack('f', struct.pack('f', value))[0]
+		ranks = {'night': float4(0.61), 'dragon': float4(0.62)}
+		with patch.object(PythonSearchEngine, '_rank', lambda engine, tokens, title, description: ranks.get(title[0], 0.0)):
+			first = self.client.get('/api/videos/', {'search': 'dragon', 'page_size': 1}).json()
+			second = self.client.get(first['next']).json()
+
+		self.assertEqual(
+			[first['results'][0]['id'], second['results'][0]['id']],
+			[self.title_hit.id, self.description_hit.id]
+		)
+		self.assertIsNone(second['next'])
+
+
+class ConditionalCatalogResponseTest(TestCase):
+	"""Catalog endpoints answer matching validators with 304 until the catalog changes."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='etag@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+		self.genre = Genre.objects.create(name='Action', slug='action')
+		self.video = Video.objects.create(title='Test Video', description='Desc', genre=self.genre)
+
+	def test_matching_etag_returns_304_without_queries(self):
+		for url in ['/api/videos/', f'/api/videos/{self.video.id}/', '/api/videos/by_genre/', '/api/genres/']:
+			with self.subTest(url=url):
+				response = self.client.get(url)
+				self.assertEqual(response.status_code, 200)
+				self.assertIn('Last-Modified', response)
+				with self.assertNumQueries(0):
+					response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+				self.assertEqual(response.status_code, 304)
+
+	def test_catalog_change_invalidates_etag(self):
+		etag = self.client.get('/api/videos/')['ETag']
+		with self.captureOnCommitCallbacks(execute=True):
+			self.video.title = 'Renamed'
+			self.video.save()
+		response = self.client.get('/api/videos/', HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 200)
+		self.assertNotEqual(response['ETag'], etag)
+
+
+class CatalogResponseCacheTest(TestCase):
+	"""Rendered list/detail responses are reused until the catalog version changes."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='cached@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+		self.genre = Genre.objects.create(name='Action', slug='action')
+		self.video = Video.objects.create(title='Test Video', description='Desc', genre=self.genre, release_year=2001)
+
+	def test_repeated_request_is_served_from_cache(self):
+		first = self.client.get('/api/videos/?ordering=title&release_year=2001')
+		with self.assertNumQueries(0):
+			second = self.client.get('/api/videos/?release_year=2001&ordering=title')
+		self.assertEqual(second.content, first.content)
+		self.assertEqual(second['Content-Type'], 'application/json')
+		self.assertEqual(get_response_cache_stats()['hits'], 1)
+		self.assertEqual(get_response_cache_stats()['misses'], 1)
+
+	def test_query_parameters_are_part_of_the_key(self):
+		self.client.get('/api/videos/?release_year=2001')
+		response = self.client.get('/api/videos/?release_year=1999')
+		self.assertEqual(response.json()['results'], [])
+
+	def test_catalog_change_retires_cached_responses(self):
+		self.client.get(f'/api/videos/{self.video.id}/')
+		with self.captureOnCommitCallbacks(execute=True):
+			self.video.title = 'Renamed'
+			self.video.save()
+		self.assertEqual(self.client.get(f'/api/videos/{self.video.id}/').json()['title'], 'Renamed')
+
+	@override_settings(CATALOG_RESPONSE_CACHE_ENABLED=False)
+	def test_cache_can_be_disabled(self):
+		self.client.get('/api/genres/')
+		with self.assertNumQueries(1):
+			self.client.get('/api/genres/')
+		self.assertEqual(get_response_cache_stats()['hits'], 0)
+
+
+class PlaybackBootstrapTest(TestCase):
+	"""playback returns every rendition from one query, then from cache."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='player@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+		genre = Genre.objects.create(name='Action', slug='action')
+		self.video = Video.objects.create(title='Test Video', description='Desc', genre=genre, duration=90)
+		VideoFile.objects.bulk_create([
+			VideoFile(video=self.video, resolution='original', file='videos/test.mp4', file_size=1000),
+			VideoFile(
+				video=self.video, resolution='720p', file='videos/hls/720p/test/playlist.m3u8',
+				file_size=500, bitrate=2500, height=720
+			),
+		])
+
+	def test_single_query_then_cache_hit(self):
+		with self.assertNumQueries(1):
+			response = self.client.get(f'/api/videos/{self.video.id}/playback/?resolution=720p')
+		body = response.json()
+		self.assertEqual(body['video_url'], '/media/videos/hls/720p/test/playlist.m3u8')
+		self.assertEqual(body['duration'], 90)
+		self.assertEqual([r['resolution'] for r in body['renditions']], ['original', '720p'])
+		self.assertEqual(body['renditions'][1]['bitrate'], 2500)
+
+		with self.assertNumQueries(0):
+			self.client.get(f'/api/videos/{self.video.id}/playback/')
+
+	def test_missing_resolution_falls_back_to_original(self):
+		body = self.client.get(f'/api/videos/{self.video.id}/playback/?resolution=1080p').json()
+		self.assertEqual(body['resolution'], 'original')
+		self.assertEqual(body['video_url'], '/media/videos/test.mp4')
+
+	def test_new_rendition_invalidates_manifest(self):
+		self.client.get(f'/api/videos/{self.video.id}/playback/')
+		with self.captureOnCommitCallbacks(execute=True):
+			VideoFile.objects.create(video=self.video, resolution='360p', file='videos/hls/360p/test/playlist.m3u8', file_size=1)
+		body = self.client.get(f'/api/videos/{self.video.id}/playback/?resolution=360p').json()
+		self.assertEqual(body['resolution'], '360p')
+
+	def test_defaults_to_master_playlist(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			VideoFile.objects.create(video=self.video, resolution='auto', file='hls/auto/test/master.m3u8', file_size=1)
+		body = self.client.get(f'/api/videos/{self.video.id}/playback/').json()
+		self.assertEqual(body['resolution'], 'auto')
+		self.assertEqual(body['video_url'], '/media/hls/auto/test/master.m3u8')
+
+	def test_unknown_video_returns_404(self):
+		self.assertEqual(self.client.get('/api/videos/999999/playback/').status_code, 404)
+
+	def test_stream_url_uses_manifest(self):
+		body = self.client.get(f'/api/videos/{self.video.id}/stream_url/?resolution=720p').json()
+		self.assertEqual(body['available_resolutions'], ['720p', 'original'])
+		self.assertEqual(body['video_url'], '/media/videos/hls/720p/test/playlist.m3u8')
+
+
+class AsyncCatalogUrls:
+	"""URLconf with the async catalog views routed in front of the DRF router."""
+	urlpatterns = [
+		path('api/', include('videos.async_urls')),
+		path('', include('core.urls')),
+	]
+
+
+@override_settings(ROOT_URLCONF=AsyncCatalogUrls)
+class AsyncCatalogViewTest(TestCase):
+	"""Async catalog views answer cache hits and revalidations without touching the database."""
+
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(email='async@example.com', password='Test1234!', is_active=True)
+		self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(self.user)}'
+		genre = Genre.objects.create(name='Action', slug='action')
+		self.video = Video.objects.create(title='Test Video', description='Desc', genre=genre, duration=90)
+		VideoFile.objects.bulk_create([
+			VideoFile(video=self.video, resolution='720p', file='hls/720p/test/playlist.m3u8', file_size=1),
+		])
+
+	def test_requires_access_token(self):
+		response = self.client.get('/api/videos/', HTTP_AUTHORIZATION='')
+		self.assertEqual(response.status_code, 401)
+		self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+		self.assertEqual(self.client.get('/api/videos/', HTTP_AUTHORIZATION='Bearer broken').status_code, 401)
+
+	def test_cache_hits_and_revalidations_run_no_queries(self):
+		for url in ['/api/videos/', f'/api/videos/{self.video.id}/', '/api/genres/', '/api/videos/by_genre/']:
+			with self.subTest(url=url):
+				first = self.client.get(url)
+				self.assertEqual(first.status_code, 200)
+				with self.assertNumQueries(0):
+					second = self.client.get(url)
+					revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+				self.assertEqual(second.content, first.content)
+				self.assertEqual(revalidated.status_code, 304)
+
+	def test_matches_drf_responses(self):
+		drf_client = APIClient()
+		drf_client.force_authenticate(user=self.user)
+		with self.settings(ROOT_URLCONF='core.urls'):
+			expected = drf_client.get('/api/videos/by_genre/').json()
+		cache.clear()
+		self.assertEqual(self.client.get('/api/videos/by_genre/').json(), expected)
+
+	def test_playback(self):
+		body = self.client.get(f'/api/videos/{self.video.id}/playback/?resolution=720p').json()
+		self.assertEqual(body['video_url'], '/media/hls/720p/test/playlist.m3u8')
+		self.assertEqual(body['duration'], 90)
+		with self.assertNumQueries(0):
+			self.client.get(f'/api/videos/{self.video.id}/playback/')
+		self.assertEqual(self.client.get('/api/videos/999999/playback/').status_code, 404)
+
+
+class ResponseCompressionTest(TestCase):
+	"""API responses are compressed per Accept-Encoding, cached responses only once."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='gzip@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+		genre = Genre.objects.create(name='Action', slug='action')
+		Video.objects.bulk_create([
+			Video(title=f'Video {i}', description='A long and repetitive description', genre=genre) for i in range(20)
+		])
+
+	def test_negotiate_encoding(self):
+		self.assertEqual(negotiate_encoding('gzip, deflate'), 'gzip')
+		self.assertEqual(negotiate_encoding('gzip;q=0, identity'), None)
+		self.assertEqual(negotiate_encoding('*'), SUPPORTED_ENCODINGS[0])
+		self.assertEqual(negotiate_encoding(''), None)
+
+	def test_large_json_is_gzipped_once_per_catalog_version(self):
+		with patch('videos.middleware.compress', wraps=compress) as compress_mock:
+			response = self.client.get('/api/videos/', HTTP_ACCEPT_ENCODING='gzip')
+			self.client.get('/api/videos/', HTTP_ACCEPT_ENCODING='gzip')
+		self.assertEqual(response['Content-Encoding'], 'gzip')
+		self.assertIn('Accept-Encoding', response['Vary'])
+		self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 20)
+		self.assertEqual(compress_mock.call_count, 1)
+
+	def test_uncompressed_when_not_accepted_or_too_small(self):
+		response = self.client.get('/api/videos/')
+		self.assertFalse(response.has_header('Content-Encoding'))
+		self.assertIn('Accept-Encoding', response['Vary'])
+		with self.settings(COMPRESSION_MIN_SIZE=10 ** 6):
+			response = self.client.get('/api/genres/', HTTP_ACCEPT_ENCODING='gzip')
+		self.assertFalse(response.has_header('Content-Encoding'))
+
+	def test_media_is_not_compressed(self):
+		media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, media_root)
+		with open(os.path.join(media_root, 'notes.txt'), 'w') as notes:
+			notes.write('x' * 5000)
+		with self.settings(MEDIA_ROOT=media_root, MEDIA_DELIVERY_MODE='django'):
+			response = self.client.get('/media/notes.txt', HTTP_ACCEPT_ENCODING='gzip')
+		self.assertFalse(response.has_header('Content-Encoding'))
+
+	@skipUnless('br' in SUPPORTED_ENCODINGS, 'brotli is not installed')
+	def test_brotli_is_preferred(self):
+		response = self.client.get('/api/videos/', HTTP_ACCEPT_ENCODING='gzip, br')
+		self.assertEqual(response['Content-Encoding'], 'br')
+
+
+class MasterPlaylistTest(TestCase):
+	"""Master playlist attributes are derived from the rendition outputs."""
+
+	def test_bandwidth_is_measured_from_segments(self):
+		with tempfile.TemporaryDirectory() as hls_dir:
+			for name, size in [('segment_000.ts', 6000), ('segment_001.ts', 1000)]:
+				with open(os.path.join(hls_dir, name), 'wb') as segment:
+					segment.write(b'\0' * size)
+			playlist_path = os.path.join(hls_dir, 'playlist.m3u8')
+			with open(playlist_path, 'w') as playlist:
+				playlist.write(
+					'#EXTM3U\n#EXT-X-TARGETDURATION:6\n'
+					'#EXTINF:6.000000,\nsegment_000.ts\n'
+					'#EXTINF:2.000000,\nsegment_001.ts\n#EXT-X-ENDLIST\n'
+				)
+			self.assertEqual(measure_hls_bandwidth(playlist_path), (8000, 7000))
+
+	def test_codecs_string_from_probe(self):
+		streams = [
+			{'codec_type': 'video', 'codec_name': 'h264', 'profile': 'High', 'level': 40},
+			{'codec_type': 'audio', 'codec_name': 'aac', 'profile': 'LC'},
+		]
+		self.assertEqual(build_codecs_string(streams), 'avc1.640028,mp4a.40.2')
+
+	def test_variants_are_listed_lowest_bandwidth_first(self):
+		playlist = build_master_playlist([
+			{'uri': '../../720p/a/playlist.m3u8', 'bandwidth': 2800000, 'width': 1280, 'height': 720, 'codecs': 'avc1.64001F,mp4a.40.2'},
+			{'uri': '../../360p/a/playlist.m3u8', 'bandwidth': 900000, 'width': 640, 'height': 360},
+		])
+		lines = playlist.splitlines()
+		self.assertEqual(lines[3], '#EXT-X-STREAM-INF:BANDWIDTH=900000,RESOLUTION=640x360')
+		self.assertEqual(lines[4], '../../360p/a/playlist.m3u8')
+		self.assertEqual(
+			lines[5],
+			'#EXT-X-STREAM-INF:BANDWIDTH=2800000,RESOLUTION=1280x720,CODECS="avc1.64001F,mp4a.40.2"'
+		)
+
+
+class SinglePassTranscodeTest(TestCase):
+	"""Single-pass mode encodes every missing rendition from one decode."""
+
+	def test_command_splits_one_decode_into_all_outputs(self):
+		command = build_ffmpeg_multi_hls_command('/media/videos/in.mp4', [
+			('/media/hls/720p/in/playlist.m3u8', '/media/hls/720p/in/segment_%03d.ts', 720, '2500k', '128k'),
+			('/media/hls/360p/in/playlist.m3u8', '/media/hls/360p/in/segment_%03d.ts', 360, '800k', '96k'),
+		])
+		self.assertEqual(command.count('-i'), 1)
+		self.assertEqual(
+			command[command.index('-filter_complex') + 1],
+			'[0:v]split=2[v0in][v1in];[v0in]scale=-2:720[v0];[v1in]scale=-2:360[v1]'
+		)
+		self.assertEqual(command[-1], '/media/hls/360p/in/playlist.m3u8')
+		self.assertEqual(command.count('-hls_segment_filename'), 2)
+		self.assertEqual(command[command.index('[v1]') + 2:command.index('[v1]') + 4], ['0:a:0?', '-c:v'])
+
+	def test_only_missing_resolutions_are_encoded(self):
+		video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Action', slug='action'))
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='original', file='videos/originals/clip.mp4', file_size=1),
+			VideoFile(video=video, resolution='720p', file='hls/720p/clip/playlist.m3u8', file_size=1),
+		])
+		original = VideoFile.objects.get(video=video, resolution='original')
+		media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, media_root)
+		source_path = os.path.join(media_root, 'videos', 'originals', 'clip.mp4')
+
+		with patch('videos.tasks.run_ffmpeg_conversion', return_value=True) as run_mock, \
+				patch('videos.tasks.create_video_file_entry') as entry_mock:
+			_convert_single_pass(original, source_path, 'clip')
+
+		command = run_mock.call_args[0][0]
+		self.assertEqual(command.count('-hls_segment_filename'), len(RESOLUTION_CONFIGS) - 1)
+		self.assertNotIn(os.path.join(media_root, 'hls', '720p', 'clip', 'playlist.m3u8'), command)
+		self.assertEqual(
+			[call.args[1] for call in entry_mock.call_args_list],
+			[name for name, *_ in RESOLUTION_CONFIGS if name != '720p']
+		)
+
+
+@override_settings(VIDEO_TRANSCODE_MODE='per-rendition')
+class RenditionFanOutTest(TestCase):
+	"""Per-rendition mode enqueues one job per resolution and dependent finalize jobs."""
+
+	def test_finalize_depends_on_every_rendition_job(self):
+		video = Video.objects.create(
+			title='Clip', description='Desc', duration=600, genre=Genre.objects.create(name='Action', slug='action')
+		)
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='original', file='videos/clip.mp4', file_size=1, width=1920, height=1080),
+		])
+		original = VideoFile.objects.get(video=video)
+		queues = {}
+
+		with patch('videos.tasks.django_rq.get_queue', side_effect=lambda name: queues.setdefault(name, MagicMock(name=name))), \
+				patch('videos.tasks.enqueue_shortest_first', side_effect=lambda queue, cost, *args: (queue._mock_name, cost, args)) as schedule_mock, \
+				patch('videos.tasks._generate_thumbnails'):
+			final_job = prepare_conversion(original.id)
+
+		self.assertEqual(
+			[call.args[2:] for call in schedule_mock.call_args_list],
+			[(convert_rendition, original.id, '120p')] + [
+				(convert_rendition, original.id, name) for name, *_ in RESOLUTION_CONFIGS if name != '120p'
+			]
+		)
+		first_job = ('fast-renditions', estimate_encode_cost(600, [120]), (convert_rendition, original.id, '120p'))
+		playable_call, final_call = queues['fast-renditions'].enqueue.call_args_list
+		self.assertEqual(playable_call.args, (finalize_conversion, original.id))
+		self.assertEqual(playable_call.kwargs['depends_on'], [first_job])
+		self.assertEqual(final_call.args, (finalize_conversion, original.id))
+		self.assertEqual(len(final_call.kwargs['depends_on']), len(RESOLUTION_CONFIGS))
+		self.assertEqual(
+			{job[0] for job in final_call.kwargs['depends_on'][:-1]},
+			{'heavy-renditions'}
+		)
+		self.assertIs(final_job, queues['fast-renditions'].enqueue.return_value)
+
+	def test_failed_rendition_fails_its_job(self):
+		video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Action', slug='action'))
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='original', file='videos/originals/clip.mp4', file_size=1),
+		])
+		original = VideoFile.objects.get(video=video)
+		media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, media_root)
+		with self.settings(MEDIA_ROOT=media_root), \
+				patch('videos.tasks.run_ffmpeg_conversion', return_value=False), \
+				self.assertRaises(RuntimeError):
+			convert_rendition(original.id, '720p')
+
+
+class ChunkedTranscodeTest(TestCase):
+	"""Chunked mode encodes keyframe-aligned chunks in parallel and stitches their playlists."""
+
+	def setUp(self):
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root)
+
+	def write_chunk_output(self, playlist_path, durations):
+		"""Write an HLS playlist with one segment per duration, as FFmpeg would"""
+		os.makedirs(os.path.dirname(playlist_path), exist_ok=True)
+		lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:7']
+		for index, duration in enumerate(durations):
+			with open(os.path.join(os.path.dirname(playlist_path), f'segment_{index:03d}.ts'), 'wb') as segment:
+				segment.write(b'\0' * 100)
+			lines += [f'#EXTINF:{duration},', f'segment_{index:03d}.ts']
+		with open(playlist_path, 'w') as playlist:
+			playlist.write('\n'.join(lines + ['#EXT-X-ENDLIST']) + '\n')
+
+	def fake_ffmpeg(self, command, resolution, video_title, on_progress=None):
+		for index, argument in enumerate(command):
+			if argument == '-hls_segment_filename':
+				self.write_chunk_output(os.path.join(os.path.dirname(command[index + 1]), 'playlist.m3u8'), [6.0, 2.5])
+		return True
+
+	def test_stitched_playlist_renumbers_segments_across_chunks(self):
+		first = os.path.join(self.media_root, 'chunks', '0000', 'playlist.m3u8')
+		second = os.path.join(self.media_root, 'chunks', '0001', 'playlist.m3u8')
+		self.write_chunk_output(first, [6.0, 6.0, 3.2])
+		self.write_chunk_output(second, [6.4, 1.0])
+		output_dir = os.path.join(self.media_root, 'out')
+		os.makedirs(output_dir)
+
+		playlist_path = stitch_hls_playlists([first, second], output_dir)
+
+		with open(playlist_path) as playlist:
+			lines = playlist.read().splitlines()
+		self.assertIn('#EXT-X-TARGETDURATION:7', lines)
+		self.assertEqual(lines.count('#EXT-X-DISCONTINUITY'), 1)
+		self.assertEqual(lines[lines.index('#EXT-X-DISCONTINUITY') + 2], 'segment_003.ts')
+		self.assertEqual(lines[-1], '#EXT-X-ENDLIST')
+		self.assertEqual(
+			parse_hls_playlist(playlist_path),
+			[(6.0, 'segment_000.ts'), (6.0, 'segment_001.ts'), (3.2, 'segment_002.ts'),
+				(6.4, 'segment_003.ts'), (1.0, 'segment_004.ts')]
+		)
+		self.assertTrue(all(
+			os.path.exists(os.path.join(output_dir, f'segment_{index:03d}.ts')) for index in range(5)
+		))
+
+	def test_chunks_are_stitched_per_resolution(self):
+		video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Action', slug='action'))
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='original', file='videos/originals/clip.mp4', file_size=1),
+		])
+		original = VideoFile.objects.get(video=video)
+		source_path = os.path.join(self.media_root, 'videos', 'clip.mp4')
+		chunks = ['/work/chunk_0000.mkv', '/work/chunk_0001.mkv', '/work/chunk_0002.mkv']
+
+		with patch('videos.tasks.split_into_chunks', return_value=chunks), \
+				patch('videos.tasks.run_ffmpeg_conversion', side_effect=self.fake_ffmpeg) as run_mock, \
+				patch('videos.tasks.create_video_file_entry') as entry_mock:
+			_convert_chunked(original, source_path, 'clip')
+
+		self.assertEqual(sorted(call.args[0][2] for call in run_mock.call_args_list), chunks)
+		self.assertEqual(
+			[call.args[1] for call in entry_mock.call_args_list],
+			[name for name, *_ in RESOLUTION_CONFIGS]
+		)
+		playlist_path = entry_mock.call_args_list[0].args[2]
+		self.assertEqual(playlist_path, os.path.join(self.media_root, 'hls', '1080p', 'clip', 'playlist.m3u8'))
+		self.assertEqual(len(parse_hls_playlist(playlist_path)), 6)
+		self.assertFalse(os.path.exists(os.path.join(self.media_root, 'hls', '_chunks', 'clip')))
+
+	def test_failed_chunk_records_no_rendition(self):
+		video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Action', slug='action'))
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='original', file='videos/originals/clip.mp4', file_size=1),
+		])
+		original = VideoFile.objects.get(video=video)
+		source_path = os.path.join(self.media_root, 'videos', 'clip.mp4')
+
+		with patch('videos.tasks.split_into_chunks', return_value=['/work/chunk_0000.mkv', '/work/chunk_0001.mkv']), \
+				patch('videos.tasks.run_ffmpeg_conversion', side_effect=[True, False]), \
+				patch('videos.tasks.create_video_file_entry') as entry_mock:
+			_convert_chunked(original, source_path, 'clip')
+
+		entry_mock.assert_not_called()
+
+
+class SourceAnalysisTest(TestCase):
+	"""The ladder never exceeds the probed source, whose metadata is recorded once."""
+
+	def setUp(self):
+		self.video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Action', slug='action'))
+
+	def test_ladder_skips_upscaling_and_caps_bitrate(self):
+		ladder = build_effective_ladder({'width': 854, 'height': 480, 'bitrate': 600000, 'duration': 60.0})
+		self.assertEqual(ladder, [('360p', 360, '600k', '96k'), ('120p', 120, '300k', '64k')])
+
+	def test_tiny_source_keeps_lowest_rendition_at_source_height(self):
+		ladder = build_effective_ladder({'width': 170, 'height': 95, 'bitrate': None, 'duration': None})
+		self.assertEqual(ladder, [('120p', 94, '300k', '64k')])
+
+	def test_unknown_source_keeps_full_ladder(self):
+		self.assertEqual(build_effective_ladder(None), RESOLUTION_CONFIGS)
+
+	def test_probe_is_recorded_on_original_and_video(self):
+		VideoFile.objects.bulk_create([
+			VideoFile(video=self.video, resolution='original', file='videos/clip.mp4', file_size=1),
+		])
+		original = VideoFile.objects.select_related('video').get(video=self.video)
+		probe = {'width': 1280, 'height': 720, 'bitrate': 2345678, 'duration': 61.6}
+
+		with patch('videos.functions.probe_source', return_value=probe) as probe_mock:
+			self.assertEqual(analyze_source(original, '/media/videos/clip.mp4'), probe)
+			again = analyze_source(VideoFile.objects.select_related('video').get(pk=original.pk), '/media/videos/clip.mp4')
+
+		probe_mock.assert_called_once()
+		self.assertEqual((again['height'], again['bitrate'], again['duration']), (720, 2346000, 62))
+		original.refresh_from_db()
+		self.assertEqual((original.width, original.height, original.bitrate), (1280, 720, 2346))
+		self.assertEqual(Video.objects.get(pk=self.video.pk).duration, 62)
+
+	def test_rendition_above_source_is_skipped(self):
+		VideoFile.objects.bulk_create([
+			VideoFile(video=self.video, resolution='original', file='videos/clip.mp4', file_size=1, width=640, height=360),
+		])
+		original = VideoFile.objects.get(video=self.video)
+
+		with patch('videos.tasks.run_ffmpeg_conversion') as run_mock:
+			convert_rendition(original.id, '720p')
+
+		run_mock.assert_not_called()
+
+
+class ConversionCheckpointTest(TestCase):
+	"""Renditions abandoned by a crashed worker are detected and resumed, finished ones are kept."""
+
+	def setUp(self):
+		self.video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Action', slug='action'))
+
+	def set_state(self, resolution, status, heartbeat_age=0):
+		RenditionState.objects.update_or_create(
+			video=self.video, resolution=resolution,
+			defaults={'status': status, 'heartbeat_at': timezone.now() - timedelta(seconds=heartbeat_age)}
+		)
+
+	def test_live_rendition_is_not_claimed_twice(self):
+		self.set_state('720p', RenditionState.RUNNING)
+		self.set_state('360p', RenditionState.RUNNING, heartbeat_age=600)
+
+		self.assertEqual(claim_renditions(self.video, ['720p', '360p', '120p']), ['360p', '120p'])
+		self.assertEqual(RenditionState.objects.get(video=self.video, resolution='360p').attempts, 1)
+
+	def test_finished_rendition_is_not_claimed(self):
+		self.set_state('720p', RenditionState.DONE, heartbeat_age=600)
+
+		self.assertEqual(claim_renditions(self.video, ['720p']), [])
+		self.assertEqual(RenditionState.objects.get(video=self.video, resolution='720p').status, RenditionState.DONE)
+
+	def test_unfinished_claims_are_marked_failed(self):
+		with self.assertRaises(RuntimeError):
+			with checkpointed(self.video, ['720p']):
+				raise RuntimeError('ffmpeg vanished')
+
+		state = RenditionState.objects.get(video=self.video, resolution='720p')
+		self.assertEqual((state.status, state.error), (RenditionState.FAILED, 'ffmpeg vanished'))
+
+	def test_stale_and_failed_videos_are_resumable(self):
+		other = Video.objects.create(title='Other', description='Desc', genre=self.video.genre)
+		self.set_state('720p', RenditionState.RUNNING, heartbeat_age=600)
+		RenditionState.objects.create(video=other, resolution='720p', status=RenditionState.FAILED)
+
+		self.assertEqual(find_resumable_videos(), [self.video.id])
+		self.assertEqual(find_resumable_videos(include_failed=True), [self.video.id, other.id])
+
+	def test_resume_only_encodes_unfinished_renditions(self):
+		VideoFile.objects.bulk_create([
+			VideoFile(video=self.video, resolution='original', file='videos/clip.mp4', file_size=1),
+			VideoFile(video=self.video, resolution='720p', file='hls/720p/clip/playlist.m3u8', file_size=1),
+		])
+		original = VideoFile.objects.get(video=self.video, resolution='original')
+		self.set_state('720p', RenditionState.DONE)
+		self.set_state('360p', RenditionState.RUNNING, heartbeat_age=600)
+		media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, media_root)
+		partial_dir = os.path.join(media_root, 'hls', '360p', 'clip')
+		os.makedirs(partial_dir)
+		open(os.path.join(partial_dir, 'segment_000.ts'), 'wb').close()
+
+		with patch('videos.tasks.run_ffmpeg_conversion', return_value=True) as run_mock, \
+				patch('videos.tasks.create_video_file_entry', return_value=True):
+			_convert_single_pass(original, os.path.join(media_root, 'videos', 'clip.mp4'), 'clip')
+
+		self.assertEqual(run_mock.call_args[0][1], ', '.join(name for name, *_ in RESOLUTION_CONFIGS if name != '720p'))
+		self.assertEqual(os.listdir(partial_dir), [])
+		self.assertEqual(
+			set(RenditionState.objects.filter(video=self.video).values_list('status', flat=True)),
+			{RenditionState.DONE}
+		)
+
+	def test_resume_command_enqueues_abandoned_conversions(self):
+		VideoFile.objects.bulk_create([
+			VideoFile(video=self.video, resolution='original', file='videos/clip.mp4', file_size=1),
+		])
+		self.set_state('720p', RenditionState.RUNNING, heartbeat_age=600)
+
+		with patch('videos.management.commands.resume_conversions.enqueue_conversion') as enqueue_mock:
+			call_command('resume_conversions', stdout=io.StringIO())
+			call_command('resume_conversions', stdout=io.StringIO())
+
+		enqueue_mock.assert_called_once_with(VideoFile.objects.get(video=self.video).id)
+		self.assertEqual(RenditionState.objects.get(video=self.video).status, RenditionState.PENDING)
+
+
+class ConversionProgressTest(TestCase):
+	"""FFmpeg progress is streamed, published to the cache at a throttled rate and exposed per rendition."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='encoder@example.com', password='Test1234!', is_active=True)
+		self.client.force_authenticate(user=self.user)
+		self.video = Video.objects.create(
+			title='Clip', description='Desc', duration=120, genre=Genre.objects.create(name='Action', slug='action')
+		)
+
+	def fake_ffmpeg(self, script):
+		"""Executable standing in for ffmpeg; it ignores its arguments"""
+		directory = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, directory)
+		path = os.path.join(directory, 'ffmpeg')
+		with open(path, 'w') as executable:
+			executable.write('#!/bin/sh\n' + script)
+		os.chmod(path, 0o755)
+		return path
+
+	def test_progress_blocks_are_parsed(self):
+		lines = [
+			'frame=10\n', 'out_time_us=-23220\n', 'speed=N/A\n', 'progress=continue\n',
+			'out_time_ms=30500000\n', 'speed=2.5x\n', 'progress=continue\n',
+			'out_time_us=60000000\n', 'out_time_ms=60000000\n', 'speed=2.41x\n', 'progress=end\n',
+		]
+		self.assertEqual(list(parse_ffmpeg_progress(lines)), [(0.0, None), (30.5, 2.5), (60.0, 2.41)])
+
+	def test_progress_is_streamed_while_ffmpeg_runs(self):
+		ffmpeg = self.fake_ffmpeg(
+			"printf 'out_time_us=1000000\\nspeed=2x\\nprogress=continue\\n'\n"
+			"printf 'out_time_us=2000000\\nspeed=2x\\nprogress=end\\n'\n"
+		)
+		reports = []
+		self.assertTrue(run_ffmpeg_conversion([ffmpeg, '-i', 'in.mp4'], '720p', 'Clip', lambda *report: reports.append(report)))
+		self.assertEqual(reports, [(1.0, 2.0), (2.0, 2.0)])
+
+	def test_failure_logs_the_end_of_stderr(self):
+		ffmpeg = self.fake_ffmpeg('for i in $(seq 1 500); do echo "line $i" >&2; done\nexit 1\n')
+		with self.assertLogs('videos.utils', level='ERROR') as logs:
+			self.assertFalse(run_ffmpeg_conversion([ffmpeg], '720p', 'Clip'))
+		self.assertIn('line 500', logs.output[0])
+		self.assertNotIn('line 400\n', logs.output[0])
+
+	def test_publication_is_throttled_and_chunks_are_summed(self):
+		now = [0.0]
+		progress = ConversionProgress(self.video, ['720p', '360p'], clock=lambda: now[0])
+		progress.part(0)(30.0, 1.5)
+		progress.part(1)(20.0, 1.5)  # Within the interval: recorded, not published
+		self.assertEqual(cache.get(f'videos:progress:{self.video.id}:720p')['percent'], 25.0)
+
+		now[0] = 5.0
+		progress.part(0)(36.0, 1.0)
+		published = cache.get(f'videos:progress:{self.video.id}:360p')
+		self.assertEqual((published['percent'], published['speed']), (46.7, 2.5))
+
+	def test_processing_endpoint_combines_state_and_live_progress(self):
+		RenditionState.objects.bulk_create([
+			RenditionState(video=self.video, resolution='720p', status=RenditionState.RUNNING, attempts=1),
+			RenditionState(video=self.video, resolution='1080p', status=RenditionState.DONE, attempts=1),
+			RenditionState(video=self.video, resolution='360p'),
+		])
+		ConversionProgress(self.video, ['720p']).update(60.0, 1.8)
+
+		response = self.client.get(f'/api/videos/{self.video.id}/processing/')
+
+		self.assertEqual(response.status_code, 200)
+		renditions = response.json()['renditions']
+		self.assertEqual([r['resolution'] for r in renditions], ['1080p', '720p', '360p'])
+		self.assertEqual([r['status'] for r in renditions], ['done', 'running', 'pending'])
+		self.assertEqual([r['percent'] for r in renditions], [100.0, 50.0, None])
+		self.assertEqual(renditions[1]['speed'], 1.8)
+		self.assertEqual(self.client.get('/api/videos/999/processing/').status_code, 404)
+
+	def test_final_report_is_flushed_and_failed_renditions_show_no_progress(self):
+		now = [0.0]
+		progress = ConversionProgress(self.video, ['720p'], clock=lambda: now[0])
+		progress.update(30.0, 1.5)
+		progress.update(90.0, 1.5)  # Held back by the throttle
+		progress.flush()
+		self.assertEqual(cache.get(f'videos:progress:{self.video.id}:720p')['percent'], 75.0)
+
+		RenditionState.objects.create(video=self.video, resolution='720p', status=RenditionState.FAILED, attempts=1)
+		rendition = self.client.get(f'/api/videos/{self.video.id}/processing/').json()['renditions'][0]
+		self.assertEqual((rendition['percent'], rendition['speed']), (None, None))
+
+
+class JobSchedulingTest(TestCase):
+	"""Conversion stages go to their own queues, encoding jobs shortest first."""
+
+	def queued_job(self, job_id, cost):
+		return SimpleNamespace(id=job_id, meta={'encode_cost': cost})
+
+	def test_cost_scales_with_duration_and_pixels(self):
+		self.assertEqual(estimate_encode_cost(600, [1080]), 600)
+		self.assertEqual(estimate_encode_cost(600, [1080, 540]), 750)
+		self.assertIsNone(estimate_encode_cost(None, [1080]))
+
+	def test_new_job_overtakes_costlier_jobs_only(self):
+		queued = [
+			self.queued_job('short', 30), None, self.queued_job('unknown', None),
+			self.queued_job('movie', 7200), self.queued_job('new', 60),
+		]
+		self.assertEqual(find_insertion_pivot(queued, 'new', 60), 'movie')
+		self.assertIsNone(find_insertion_pivot(queued[:1] + queued[-1:], 'new', 60))
+
+	def test_job_is_moved_in_front_of_the_pivot(self):
+		queue = MagicMock(key='rq:queue:heavy-renditions')
+		queue.enqueue.return_value = SimpleNamespace(id='new', is_queued=True)
+		move_job = queue.connection.register_script.return_value
+		move_job.return_value = 1
+
+		with patch('videos.scheduling.Job.fetch_many', return_value=[self.queued_job('movie', 7200), self.queued_job('new', 60)]):
+			enqueue_shortest_first(queue, 60, convert_renditions, 1, ['720p'])
+
+		self.assertEqual(queue.enqueue.call_args.kwargs['meta'], {'encode_cost': 60})
+		queue.connection.register_script.assert_called_once_with(MOVE_JOB_SCRIPT)
+		move_job.assert_called_once_with(keys=['rq:queue:heavy-renditions'], args=['new', 'movie'])
+		queue.connection.lpush.assert_not_called()
+		queue.connection.linsert.assert_not_called()
+
+	@override_settings(VIDEO_TRANSCODE_MODE='chunked', VIDEO_CHUNKED_JOB_TIMEOUT=3 * 60 * 60)
+	def test_chunked_timeout_never_shortens_the_queue_limit(self):
+		configs = [config for config in RESOLUTION_CONFIGS if config[0] in ('1080p', '120p')]
+		with patch('videos.tasks.django_rq.get_queue'), \
+				patch('videos.tasks.enqueue_shortest_first') as schedule_mock:
+			_enqueue_encoding('fast-renditions', 1, configs[-1:], 60)
+			_enqueue_encoding('heavy-renditions', 1, configs[:1], 60)
+
+		fast, heavy = schedule_mock.call_args_list
+		self.assertEqual(fast.kwargs, {'job_timeout': 3 * 60 * 60})
+		self.assertEqual(heavy.kwargs, {})
+
+	def test_upload_is_prepared_on_the_thumbnails_queue(self):
+		with patch('videos.tasks.django_rq.get_queue') as get_queue:
+			enqueue_conversion(42)
+		get_queue.assert_called_once_with('thumbnails')
+		self.assertEqual(get_queue.return_value.enqueue.call_args.args, (prepare_conversion, 42))
+
+	def test_single_pass_encodes_lowest_and_other_resolutions_in_two_jobs(self):
+		video = Video.objects.create(
+			title='Clip', description='Desc', duration=60, genre=Genre.objects.create(name='Action', slug='action')
+		)
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='original', file='videos/clip.mp4', file_size=1, width=1280, height=720),
+		])
+		original = VideoFile.objects.get(video=video)
+
+		with patch('videos.tasks.django_rq.get_queue'), \
+				patch('videos.tasks.enqueue_shortest_first') as schedule_mock, \
+				patch('videos.tasks._generate_thumbnails'):
+			prepare_conversion(original.id)
+
+		self.assertEqual(
+			[call.args[1:] for call in schedule_mock.call_args_list],
+			[
+				(estimate_encode_cost(60, [120]), convert_renditions, original.id, ['120p']),
+				(estimate_encode_cost(60, [720, 360]), convert_renditions, original.id, ['720p', '360p']),
+			]
+		)
+
+	def test_missing_resolution_fails_the_job(self):
+		video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Action', slug='action'))
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='original', file='videos/clip.mp4', file_size=1, height=720),
+		])
+		original = VideoFile.objects.get(video=video)
+
+		with patch('videos.tasks._convert_single_pass') as convert_mock, self.assertRaises(RuntimeError):
+			convert_renditions(original.id, ['720p', '360p'])
+		self.assertEqual([config[0] for config in convert_mock.call_args.args[3]], ['720p', '360p'])
+
+
+class MediaDeliveryTest(TestCase):
+	"""Media requests are resolved by Django and delivered per MEDIA_DELIVERY_MODE."""
+
+	def setUp(self):
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root)
+		os.makedirs(os.path.join(self.media_root, 'hls', '360p', 'clip'))
+		with open(os.path.join(self.media_root, 'hls', '360p', 'clip', 'segment_000.ts'), 'wb') as segment:
+			segment.write(b'segment-bytes')
+		self.url = '/media/hls/360p/clip/segment_000.ts'
+
+	def test_in_process_delivery(self):
+		media_file_cache.clear()
+		with self.settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY_MODE='django'):
+			response = self.client.get(self.url)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.content, b'segment-bytes')
+		self.assertEqual(response['Content-Type'], 'video/mp2t')
+
+	def test_x_accel_redirect_delivery(self):
+		with self.settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY_MODE='x-accel-redirect'):
+			response = self.client.get(self.url)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response['X-Accel-Redirect'], '/protected-media/hls/360p/clip/segment_000.ts')
+		self.assertEqual(response.content, b'')
+
+	def test_x_sendfile_delivery(self):
+		with self.settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY_MODE='x-sendfile'):
+			response = self.client.get(self.url)
+		self.assertEqual(
+			response['X-Sendfile'],
+			os.path.join(self.media_root, 'hls', '360p', 'clip', 'segment_000.ts')
+		)
+
+	def test_non_ascii_file_names_are_percent_encoded(self):
+		with open(os.path.join(self.media_root, 'hls', '360p', 'clip', 'Größe 😀.ts'), 'wb') as segment:
+			segment.write(b'segment-bytes')
+		url = '/media/hls/360p/clip/' + quote('Größe 😀.ts')
+		with self.settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY_MODE='x-sendfile'):
+			response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(unquote(response['X-Sendfile']), os.path.join(self.media_root, 'hls', '360p', 'clip', 'Größe 😀.ts'))
+		with self.settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY_MODE='x-accel-redirect'):
+			response = self.client.get(url)
+		self.assertEqual(response['X-Accel-Redirect'], '/protected-media/hls/360p/clip/' + quote('Größe 😀.ts'))
+
+	def test_missing_or_escaping_paths_return_404(self):
+		with self.settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY_MODE='x-accel-redirect'):
+			self.assertEqual(self.client.get('/media/hls/360p/clip/missing.ts').status_code, 404)
+			self.assertEqual(self.client.get('/media/../etc/passwd').status_code, 404)
+			self.assertEqual(self.client.get('/media/hls/360p/clip').status_code, 404)
+
+	def test_playback_url_plays_without_authorization_header(self):
+		# Native <video> and hls.js segment requests carry no Bearer token
+		api = APIClient()
+		api.force_authenticate(user=User.objects.create_user(email='player@example.com', password='Test1234!', is_active=True))
+		video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Drama', slug='drama'))
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='360p', file='hls/360p/clip/segment_000.ts', file_size=13),
+		])
+		url = api.get(f'/api/videos/{video.id}/playback/', {'resolution': '360p'}).json()['video_url']
+
+		media_file_cache.clear()
+		with self.settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY_MODE='django'):
+			response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.content, b'segment-bytes')
+
+
+@override_settings(MEDIA_SIGNED_URLS=True, MEDIA_DELIVERY_MODE='x-accel-redirect')
+class SignedMediaUrlTest(TestCase):
+	"""Video files need a valid, unexpired signature covering their HLS directory."""
+
+	def setUp(self):
+		cache.clear()
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root)
+		for resolution in ('auto', '720p'):
+			os.makedirs(os.path.join(self.media_root, 'hls', resolution, 'clip'))
+		for name in ('auto/clip/master.m3u8', '720p/clip/playlist.m3u8', '720p/clip/segment_000.ts'):
+			with open(os.path.join(self.media_root, 'hls', name), 'wb') as media_file:
+				media_file.write(b'data')
+
+	def test_unsigned_request_is_forbidden(self):
+		with self.settings(MEDIA_ROOT=self.media_root):
+			self.assertEqual(self.client.get('/media/hls/720p/clip/segment_000.ts').status_code, 403)
+
+	def test_signature_covers_every_rendition_of_the_video(self):
+		master_url = sign_media_url('/media/hls/auto/clip/master.m3u8')
+		prefix = master_url.rsplit('/hls/', 1)[0]
+		with self.settings(MEDIA_ROOT=self.media_root):
+			self.assertEqual(self.client.get(master_url).status_code, 200)
+			response = self.client.get(f'{prefix}/hls/720p/clip/segment_000.ts')
+			self.assertEqual(response.status_code, 200)
+			self.assertEqual(response['X-Accel-Redirect'], '/protected-media/hls/720p/clip/segment_000.ts')
+			self.assertEqual(self.client.get(f'{prefix}/hls/720p/other/playlist.m3u8').status_code, 403)
+
+	def test_expired_or_tampered_signature_is_forbidden(self):
+		expired_url = sign_media_url('/media/hls/720p/clip/playlist.m3u8', now=0)
+		_, _, _, expires, signature, path = sign_media_url('/media/hls/720p/clip/playlist.m3u8').split('/', 5)
+		with self.settings(MEDIA_ROOT=self.media_root):
+			self.assertEqual(self.client.get(expired_url).status_code, 403)
+			tampered_url = f'/media/signed/{int(expires) + 300}/{signature}/{path}'
+			self.assertEqual(self.client.get(tampered_url).status_code, 403)
+
+	def test_playback_returns_signed_urls(self):
+		client = APIClient()
+		client.force_authenticate(user=User.objects.create_user(email='signed@example.com', password='Test1234!', is_active=True))
+		video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Drama', slug='drama'))
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='auto', file='hls/auto/clip/master.m3u8', file_size=4),
+		])
+		body = client.get(f'/api/videos/{video.id}/playback/').json()
+		self.assertTrue(body['video_url'].startswith('/media/signed/'))
+		self.assertTrue(body['renditions'][0]['url'].startswith('/media/signed/'))
+		with self.settings(MEDIA_ROOT=self.media_root):
+			self.assertEqual(self.client.get(body['video_url']).status_code, 200)
+
+	def test_dot_segments_cannot_bypass_the_signature(self):
+		os.makedirs(os.path.join(self.media_root, 'videos'))
+		with open(os.path.join(self.media_root, 'videos', 'secret.mp4'), 'wb') as secret:
+			secret.write(b'secret')
+		prefix = sign_media_url('/media/hls/720p/a/playlist.m3u8').rsplit('/hls/', 1)[0]
+		with self.settings(MEDIA_ROOT=self.media_root):
+			self.assertEqual(self.client.get('/media/./videos/secret.mp4').status_code, 404)
+			self.assertEqual(self.client.get('/media//videos/secret.mp4').status_code, 403)
+			self.assertEqual(self.client.get(f'{prefix}/hls/720p/a/../../../videos/secret.mp4').status_code, 404)
+			self.assertEqual(self.client.get(f'{prefix}/hls/720p/a/./playlist.m3u8').status_code, 404)
+
+	def test_detail_file_urls_are_signed(self):
+		client = APIClient()
+		client.force_authenticate(user=User.objects.create_user(email='detail@example.com', password='Test1234!', is_active=True))
+		video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Drama', slug='drama'))
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='720p', file='hls/720p/clip/playlist.m3u8', file_size=4),
+		])
+		body = client.get(f'/api/videos/{video.id}/').json()
+		self.assertTrue(body['video_urls']['720p'].startswith('/media/signed/'))
+		self.assertTrue(body['video_files'][0]['file'].startswith('http://testserver/media/signed/'))
+		with self.settings(MEDIA_ROOT=self.media_root):
+			self.assertEqual(self.client.get(body['video_urls']['720p']).status_code, 200)
+
+	def test_catalog_validators_and_cache_move_on_with_the_signing_window(self):
+		client = APIClient()
+		client.force_authenticate(user=User.objects.create_user(email='window@example.com', password='Test1234!', is_active=True))
+		video = Video.objects.create(title='Clip', description='Desc', genre=Genre.objects.create(name='Drama', slug='drama'))
+		VideoFile.objects.bulk_create([
+			VideoFile(video=video, resolution='720p', file='hls/720p/clip/playlist.m3u8', file_size=4),
+		])
+		now = time.time()
+		with patch('videos.signing.time.time', return_value=now):
+			first = client.get(f'/api/videos/{video.id}/')
+			self.assertEqual(client.get(f'/api/videos/{video.id}/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+		with patch('videos.signing.time.time', return_value=now + 3 * 60 * 60):
+			later = client.get(f'/api/videos/{video.id}/', HTTP_IF_NONE_MATCH=first['ETag'])
+			refreshed = client.get(f'/api/videos/{video.id}/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+		self.assertEqual((later.status_code, refreshed.status_code), (200, 200))
+		self.assertNotEqual(later.json()['video_urls']['720p'], first.json()['video_urls']['720p'])
+
+	@override_settings(MEDIA_SIGNED_URL_TTL=600, CATALOG_RESPONSE_CACHE_TIMEOUT=3600)
+	def test_ttl_shorter_than_the_response_cache_is_rejected(self):
+		self.assertEqual([error.id for error in check_media_signing(None)], ['videos.E001'])
+
+	@override_settings(MEDIA_SIGNING_KEY='')
+	def test_empty_signing_key_is_rejected(self):
+		self.assertEqual([error.id for error in check_media_signing(None)], ['videos.E002'])
+
+
+class MediaRangeRequestTest(TestCase):
+	"""In-process media delivery answers Range requests with 206 / 416."""
+
+	def setUp(self):
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root)
+		os.makedirs(os.path.join(self.media_root, 'videos'))
+		self.content = bytes(range(256)) * 4
+		with open(os.path.join(self.media_root, 'videos', 'movie.mp4'), 'wb') as movie:
+			movie.write(self.content)
+		self.url = '/media/videos/movie.mp4'
+		override = self.settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY_MODE='django')
+		override.enable()
+		self.addCleanup(override.disable)
+
+	def test_parse_range_header(self):
+		self.assertEqual(parse_range_header('bytes=0-99', 1000), [(0, 99)])
+		self.assertEqual(parse_range_header('bytes=900-', 1000), [(900, 999)])
+		self.assertEqual(parse_range_header('bytes=-100', 1000), [(900, 999)])
+		self.assertEqual(parse_range_header('bytes=990-2000', 1000), [(990, 999)])
+		self.assertEqual(parse_range_header('bytes=0-0, 5-9', 1000), [(0, 0), (5, 9)])
+		self.assertEqual(parse_range_header('bytes=1000-', 1000), [])
+		self.assertIsNone(parse_range_header('bytes=5-1', 1000))
+		self.assertIsNone(parse_range_header('items=0-1', 1000))
+
+	def test_full_response_advertises_ranges(self):
+		response = self.client.get(self.url)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+	def test_single_range(self):
+		response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+		self.assertEqual(response.status_code, 206)
+		self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+		self.assertEqual(response['Content-Length'], '100')
+		self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+	def test_multiple_ranges(self):
+		response = self.client.get(self.url, HTTP_RANGE='bytes=0-9,-10')
+		self.assertEqual(response.status_code, 206)
+		self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+		body = b''.join(response.streaming_content)
+		self.assertEqual(len(body), int(response['Content-Length']))
+		self.assertIn(self.content[:10], body)
+		self.assertIn(f'Content-Range: bytes 1014-1023/{len(self.content)}'.encode(), body)
+		self.assertIn(self.content[-10:], body)
+
+	def test_unsatisfiable_range(self):
+		response = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+		self.assertEqual(response.status_code, 416)
+		self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+	def test_stale_if_range_sends_whole_file(self):
+		response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='Wed, 21 Oct 2015 07:28:00 GMT')
+		self.assertEqual(response.status_code, 200)
+
+
+class MediaFileCacheTest(TestCase):
+	"""Hot segments are served from memory and refreshed when the file changes."""
+
+	def setUp(self):
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root)
+		self.segment_path = os.path.join(self.media_root, 'segment_000.ts')
+		with open(self.segment_path, 'wb') as segment:
+			segment.write(b'first')
+		media_file_cache.clear()
+		override = self.settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY_MODE='django')
+		override.enable()
+		self.addCleanup(override.disable)
+
+	def test_second_request_is_a_hit(self):
+		self.assertEqual(self.client.get('/media/segment_000.ts')['X-Media-Cache'], 'MISS')
+		response = self.client.get('/media/segment_000.ts')
+		self.assertEqual(response['X-Media-Cache'], 'HIT')
+		self.assertEqual(response.content, b'first')
+		self.assertEqual(media_file_cache.stats()['hit_rate'], 0.5)
+
+	def test_changed_file_is_reloaded(self):
+		self.client.get('/media/segment_000.ts')
+		with open(self.segment_path, 'wb') as segment:
+			segment.write(b'second!')
+		stat = os.stat(self.segment_path)
+		os.utime(self.segment_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+		response = self.client.get('/media/segment_000.ts')
+		self.assertEqual(response['X-Media-Cache'], 'MISS')
+		self.assertEqual(response.content, b'second!')
+
+	def test_least_recently_used_entries_are_evicted(self):
+		cache = MediaFileCache(max_bytes=10, max_entry_bytes=10)
+		stat = os.stat(self.segment_path)
+		cache.put('a', stat, b'aaaa')
+		cache.put('b', stat, b'bbbb')
+		cache.get('a', stat)
+		cache.put('c', stat, b'cccc')
+		self.assertIsNone(cache.get('b', stat))
+		self.assertEqual(cache.get('a', stat), b'aaaa')
+		self.assertEqual(cache.stats()['bytes'], 8)
+
+	def test_stats_are_logged_periodically(self):
+		now = [0.0]
+		cache = MediaFileCache(max_bytes=10, max_entry_bytes=10, stats_interval=300, clock=lambda: now[0])
+		stat = os.stat(self.segment_path)
+		cache.put('a', stat, b'aaaa')
+
+		with self.assertNoLogs('videos.media_cache'):
+			cache.get('a', stat)
+		now[0] = 301
+		with self.assertLogs('videos.media_cache') as logs:
+			cache.get('b', stat)
+
+		self.assertIn('1 hits, 1 misses, hit rate 50.0%, 1 entries, 4 bytes', logs.output[0])
+
+
+class FastJSONRendererTest(TestCase):
+	"""FastJSONRenderer produces the same bytes as DRF's JSONRenderer."""
+
+	def test_output_matches_drf_renderer(self):
+		data = {
+			'title': 'Line\u2028separator – Ünïcode',
+			'created_at': timezone.now(),
+			'rating': Decimal('4.50'),
+			'label': gettext_lazy('Auto (adaptive)'),
+			'counts': {1: 2},
+			'items': [None, True, 1.5, (1, 2)],
+		}
+		self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+	def test_indented_output_falls_back_to_drf(self):
+		data = {'id': 1}
+		self.assertEqual(
+			FastJSONRenderer().render(data, 'application/json; indent=4'),
+			JSONRenderer().render(data, 'application/json; indent=4')
+		)
+
+	def test_parser(self):
+		parser = FastJSONParser()
+		self.assertEqual(parser.parse(io.BytesIO('{"title": "Ü"}'.encode())), {'title': 'Ü'})
+		with self.assertRaises(ParseError):
+			parser.parse(io.BytesIO(b'{"title": NaN}'))
+
+	def test_api_responses_use_fast_renderer(self):
+		client = APIClient()
+		client.force_authenticate(user=User.objects.create_user(email='json@example.com', password='Test1234!', is_active=True))
+		response = client.get('/api/videos/featured/')
+		self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+		self.assertEqual(response['Content-Type'], 'application/json')
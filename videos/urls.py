@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import GenreViewSet, VideoViewSet
@@ -6,6 +7,12 @@ router = DefaultRouter()
 router.register(r'genres', GenreViewSet)
 router.register(r'videos', VideoViewSet)
 
-urlpatterns = [
+urlpatterns = []
+
+# Async catalog endpoints for ASGI deployments, see async_views.py
+if settings.ASYNC_CATALOG_VIEWS:
+    urlpatterns += [path('', include('videos.async_urls'))]
+
+urlpatterns += [
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
@@ -2,12 +2,19 @@
 Utility functions for video conversion
 """
 import os
+import json
+import math
 import subprocess
+import threading
 import logging
+from collections import deque
 from .constants import (
     HLS_SEGMENT_DURATION,
+    FFMPEG_STDERR_TAIL_LINES,
     FFMPEG_PRESET,
-    DOCKER_MEDIA_ROOT
+    DOCKER_MEDIA_ROOT,
+    H264_PROFILE_CODECS,
+    AAC_PROFILE_CODECS
 )
 
 logger = logging.getLogger(__name__)
@@ -59,6 +66,125 @@ def build_ffmpeg_hls_command(source_path, playlist_path, segment_pattern, height
         'ffmpeg',
         '-i', source_path,
         '-vf', f'scale=-2:{height}',  # Maintain aspect ratio
+        *_hls_output_args(playlist_path, segment_pattern, video_bitrate, audio_bitrate)
+    ]
+
+
+def build_ffmpeg_multi_hls_command(source_path, outputs):
+    """
+    Build one FFmpeg command encoding several HLS renditions from a single decode
+    
+    The decoded video is fanned out with a split filter and scaled once per
+    rendition; every output then gets the same encoder and HLS options as
+    build_ffmpeg_hls_command.
+    
+    Args:
+        source_path: Input video file path
+        outputs: (playlist_path, segment_pattern, height, video_bitrate, audio_bitrate) tuples
+        
+    Returns:
+        list: FFmpeg command arguments
+    """
+    labels = [f'v{index}' for index in range(len(outputs))]
+    filter_graph = ';'.join([
+        f"[0:v]split={len(outputs)}{''.join(f'[{label}in]' for label in labels)}",
+        *(
+            f'[{label}in]scale=-2:{height}[{label}]'
+            for label, (_, _, height, _, _) in zip(labels, outputs)
+        )
+    ])
+    
+    command = ['ffmpeg', '-i', source_path, '-filter_complex', filter_graph]
+    for label, (playlist_path, segment_pattern, _, video_bitrate, audio_bitrate) in zip(labels, outputs):
+        command += [
+            '-map', f'[{label}]',
+            '-map', '0:a:0?',  # First audio track, if any
+            *_hls_output_args(playlist_path, segment_pattern, video_bitrate, audio_bitrate)
+        ]
+    return command
+
+
+def build_ffmpeg_split_command(source_path, chunk_pattern, chunk_seconds):
+    """
+    Build FFmpeg command cutting a video into chunks without re-encoding
+    
+    With stream copy the segment muxer can only cut at keyframes, so every
+    chunk starts with one and can be encoded independently.
+    
+    Args:
+        source_path: Input video file path
+        chunk_pattern: Output pattern, e.g. '/tmp/chunk_%04d.mkv'
+        chunk_seconds: Target chunk length in seconds
+        
+    Returns:
+        list: FFmpeg command arguments
+    """
+    return [
+        'ffmpeg',
+        '-i', source_path,
+        '-map', '0:v:0',
+        '-map', '0:a:0?',
+        '-c', 'copy',
+        '-f', 'segment',
+        '-segment_time', str(chunk_seconds),
+        '-reset_timestamps', '1',
+        '-y',
+        chunk_pattern
+    ]
+
+
+def stitch_hls_playlists(playlist_paths, output_dir, playlist_name='playlist.m3u8'):
+    """
+    Join chunk playlists into one continuous VOD playlist
+    
+    Segments are moved into output_dir and renumbered from segment_000.ts.
+    Every chunk was encoded with timestamps starting at zero, so each chunk
+    boundary is marked with EXT-X-DISCONTINUITY.
+    
+    Args:
+        playlist_paths: Chunk playlists in playback order
+        output_dir: Directory receiving the playlist and segments
+        playlist_name: File name of the stitched playlist
+        
+    Returns:
+        str: Path of the stitched playlist
+    """
+    entries = []
+    index = 0
+    target_duration = HLS_SEGMENT_DURATION
+    
+    for chunk_number, playlist_path in enumerate(playlist_paths):
+        chunk_dir = os.path.dirname(playlist_path)
+        segments = parse_hls_playlist(playlist_path)
+        if chunk_number and segments and entries:
+            entries.append('#EXT-X-DISCONTINUITY')
+        
+        for duration, filename in segments:
+            segment_name = f'segment_{index:03d}.ts'
+            os.replace(os.path.join(chunk_dir, filename), os.path.join(output_dir, segment_name))
+            entries += [f'#EXTINF:{duration:.6f},', segment_name]
+            target_duration = max(target_duration, math.ceil(duration))
+            index += 1
+    
+    lines = [
+        '#EXTM3U',
+        '#EXT-X-VERSION:3',
+        f'#EXT-X-TARGETDURATION:{target_duration}',
+        '#EXT-X-MEDIA-SEQUENCE:0',
+        '#EXT-X-PLAYLIST-TYPE:VOD',
+        '#EXT-X-INDEPENDENT-SEGMENTS',
+        *entries,
+        '#EXT-X-ENDLIST'
+    ]
+    playlist_path = os.path.join(output_dir, playlist_name)
+    with open(playlist_path, 'w') as playlist:
+        playlist.write('\n'.join(lines) + '\n')
+    return playlist_path
+
+
+def _hls_output_args(playlist_path, segment_pattern, video_bitrate, audio_bitrate):
+    """Encoder and HLS muxer options for one rendition output"""
+    return [
         '-c:v', 'libx264',
         '-b:v', video_bitrate,
         '-c:a', 'aac',
@@ -75,14 +201,19 @@ def build_ffmpeg_hls_command(source_path, playlist_path, segment_pattern, height
     ]
 
 
-def run_ffmpeg_conversion(command, resolution, video_title):
+def run_ffmpeg_conversion(command, resolution, video_title, on_progress=None):
     """
     Execute FFmpeg conversion command
     
+    FFmpeg reports its progress on stdout (-progress pipe:1), which is read
+    while it runs; of stderr only the last lines are kept for the error log.
+    
     Args:
         command: FFmpeg command arguments list
         resolution: Resolution name for logging
         video_title: Video title for logging
+        on_progress: Optional callable receiving (out_time_seconds, speed)
+                     for every progress report
         
     Returns:
         bool: True if successful, False otherwise
@@ -90,19 +221,59 @@ def run_ffmpeg_conversion(command, resolution, video_title):
     logger.info(f"Converting to HLS {resolution} for video {video_title}...")
     
     try:
-        subprocess.run(command, capture_output=True, text=True, check=True)
+        process = subprocess.Popen(
+            [command[0], '-progress', 'pipe:1', '-nostats', *command[1:]],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        stderr_tail = deque(maxlen=FFMPEG_STDERR_TAIL_LINES)
+        stderr_reader = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+        stderr_reader.start()
+        
+        for out_time, speed in parse_ffmpeg_progress(process.stdout):
+            if on_progress:
+                on_progress(out_time, speed)
+        
+        returncode = process.wait()
+        stderr_reader.join()
+        if returncode != 0:
+            logger.error(f"Error converting to HLS {resolution}: {''.join(stderr_tail)}")
+            return False
+        
         logger.info(f"Successfully converted to HLS {resolution}")
         return True
         
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error converting to HLS {resolution}: {e.stderr}")
-        return False
-        
     except Exception as e:
         logger.error(f"Unexpected error for {resolution}: {str(e)}")
         return False
 
 
+def parse_ffmpeg_progress(lines):
+    """
+    Parse FFmpeg -progress output
+    
+    Args:
+        lines: Iterable of 'key=value' lines
+        
+    Yields:
+        tuple: (out_time_seconds, speed) at the end of every progress block;
+               speed (e.g. 1.5 for '1.5x') is None while FFmpeg reports N/A
+    """
+    block = {}
+    for line in lines:
+        key, _, value = line.strip().partition('=')
+        if key != 'progress':
+            block[key] = value
+            continue
+        
+        # out_time_ms is in microseconds as well (a long-standing FFmpeg quirk)
+        out_time = _probe_number(block.get('out_time_us', block.get('out_time_ms')), int)
+        speed = _probe_number(block.get('speed', '').rstrip('x'), float)
+        yield max(out_time or 0, 0) / 1_000_000, speed
+        block = {}
+
+
 def calculate_hls_directory_size(hls_dir):
     """
     Calculate total size of all files in HLS directory
@@ -120,6 +291,21 @@ def calculate_hls_directory_size(hls_dir):
     )
 
 
+def clear_directory(path):
+    """
+    Delete all files in a directory, keeping the directory itself
+    
+    Args:
+        path: Directory path; missing directories are ignored
+    """
+    if not os.path.isdir(path):
+        return
+    for name in os.listdir(path):
+        file_path = os.path.join(path, name)
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+
+
 def get_media_relative_path(absolute_path, media_root=DOCKER_MEDIA_ROOT):
     """
     Get relative path from media root
@@ -132,3 +318,175 @@ def get_media_relative_path(absolute_path, media_root=DOCKER_MEDIA_ROOT):
         str: Relative path from media root
     """
     return os.path.relpath(absolute_path, media_root)
+
+
+def parse_hls_playlist(playlist_path):
+    """
+    Read segment durations and file names from a media playlist
+    
+    Args:
+        playlist_path: Path to a rendition playlist (.m3u8)
+        
+    Returns:
+        list: (duration_seconds, segment_filename) tuples in playlist order
+    """
+    segments = []
+    duration = None
+    
+    with open(playlist_path) as playlist:
+        for line in playlist:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line[len('#EXTINF:'):].split(',', 1)[0])
+            elif line and not line.startswith('#') and duration is not None:
+                segments.append((duration, line))
+                duration = None
+    
+    return segments
+
+
+def measure_hls_bandwidth(playlist_path):
+    """
+    Measure peak and average bandwidth of a rendition from its segment files
+    
+    Args:
+        playlist_path: Path to a rendition playlist (.m3u8)
+        
+    Returns:
+        tuple: (peak_bps, average_bps), both 0 if the playlist has no segments
+    """
+    hls_dir = os.path.dirname(playlist_path)
+    peak = 0
+    total_bits = 0
+    total_duration = 0.0
+    
+    for duration, filename in parse_hls_playlist(playlist_path):
+        bits = os.path.getsize(os.path.join(hls_dir, filename)) * 8
+        if duration > 0:
+            peak = max(peak, bits / duration)
+        total_bits += bits
+        total_duration += duration
+    
+    average = total_bits / total_duration if total_duration else 0
+    return math.ceil(peak), math.ceil(average)
+
+
+def probe_media_streams(path):
+    """
+    Read the stream information of a media file with ffprobe
+    
+    Args:
+        path: Path to a media file or segment
+        
+    Returns:
+        list: Stream dicts as reported by ffprobe, empty if probing fails
+    """
+    command = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'stream=codec_type,codec_name,profile,level,width,height',
+        '-of', 'json',
+        path
+    ]
+    
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        return json.loads(result.stdout).get('streams', [])
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        logger.error(f"ffprobe failed for {path}: {str(e)}")
+        return []
+
+
+def probe_source(path):
+    """
+    Read dimensions, bitrate and duration of a source video with ffprobe
+    
+    Args:
+        path: Path to the source video
+        
+    Returns:
+        dict: width and height (pixels), bitrate (bits/s, the video stream's
+              or else the container's) and duration (seconds); values ffprobe
+              does not report are None. None if probing fails.
+    """
+    command = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height,bit_rate:format=duration,bit_rate',
+        '-of', 'json',
+        path
+    ]
+    
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        data = json.loads(result.stdout)
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        logger.error(f"ffprobe failed for {path}: {str(e)}")
+        return None
+    
+    stream = (data.get('streams') or [{}])[0]
+    container = data.get('format', {})
+    return {
+        'width': _probe_number(stream.get('width'), int),
+        'height': _probe_number(stream.get('height'), int),
+        'bitrate': _probe_number(stream.get('bit_rate'), int) or _probe_number(container.get('bit_rate'), int),
+        'duration': _probe_number(container.get('duration'), float),
+    }
+
+
+def _probe_number(value, cast):
+    """Convert an ffprobe value, None for missing or 'N/A' values"""
+    try:
+        return cast(value) or None
+    except (TypeError, ValueError):
+        return None
+
+
+def build_codecs_string(streams):
+    """
+    Build the RFC 6381 CODECS attribute for ffprobe streams
+    
+    Args:
+        streams: Stream dicts as returned by probe_media_streams
+        
+    Returns:
+        str: e.g. 'avc1.640028,mp4a.40.2', or None if no stream is recognized
+    """
+    codecs = []
+    
+    for stream in streams:
+        if stream.get('codec_type') == 'video' and stream.get('codec_name') == 'h264':
+            prefix = H264_PROFILE_CODECS.get(stream.get('profile'))
+            level = stream.get('level')
+            if prefix and isinstance(level, int) and level > 0:
+                codecs.append(f"{prefix}{level:02X}")
+        elif stream.get('codec_type') == 'audio' and stream.get('codec_name') == 'aac':
+            codecs.append(AAC_PROFILE_CODECS.get(stream.get('profile'), 'mp4a.40.2'))
+    
+    return ','.join(codecs) or None
+
+
+def build_master_playlist(variants):
+    """
+    Build a multi-variant HLS master playlist
+    
+    Args:
+        variants: Dicts with uri, bandwidth and optional average_bandwidth,
+                  width, height and codecs
+        
+    Returns:
+        str: Playlist content, variants ordered from lowest to highest bandwidth
+    """
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-INDEPENDENT-SEGMENTS']
+    
+    for variant in sorted(variants, key=lambda v: v['bandwidth']):
+        attributes = [f"BANDWIDTH={variant['bandwidth']}"]
+        if variant.get('average_bandwidth'):
+            attributes.append(f"AVERAGE-BANDWIDTH={variant['average_bandwidth']}")
+        if variant.get('width') and variant.get('height'):
+            attributes.append(f"RESOLUTION={variant['width']}x{variant['height']}")
+        if variant.get('codecs'):
+            attributes.append(f'CODECS="{variant["codecs"]}"')
+        lines.append(f"#EXT-X-STREAM-INF:{','.join(attributes)}")
+        lines.append(variant['uri'])
+    
+    return '\n'.join(lines) + '\n'
@@ -1,9 +1,25 @@
 from rest_framework import viewsets, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
+from .cache import get_random_featured_payload
+from .constants import BY_GENRE_VIDEO_LIMIT, MASTER_PLAYLIST_RESOLUTION
+from .decorators import catalog_conditional, cached_catalog_response
 from .models import Genre, Video
-from .serializers import GenreSerializer, VideoListSerializer, VideoDetailSerializer
+from .playback import build_playback_response, get_playback_manifest, select_rendition
+from .progress import get_processing_status
+from .search import VideoSearchFilter, SearchRankOrderingFilter
+from .serializers import (
+    GenreSerializer,
+    VideoListSerializer,
+    VideoDetailSerializer,
+    finish_media_urls,
+    get_batch_ids,
+    get_sparse_fields,
+    group_videos_by_genre
+)
+from .signing import sign_media_url
 
 class GenreViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -12,64 +28,134 @@ class GenreViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['name']
+    ordering = ['name']
+
+    @catalog_conditional
+    @cached_catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @catalog_conditional
+    @cached_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
 class VideoViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for browsing and retrieving videos
     """
-    queryset = Video.objects.all()
+    queryset = Video.objects.with_api_relations()
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    lookup_value_regex = r'[0-9]+'
+    filter_backends = [DjangoFilterBackend, VideoSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['genre', 'is_featured', 'release_year']
-    search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'title', 'release_year']
     ordering = ['-created_at']
 
+    @catalog_conditional
+    @cached_catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @catalog_conditional
+    @cached_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_serializer_class(self):
         """Use different serializers for list and detail views"""
-        if self.action == 'retrieve':
+        if self.action in ('retrieve', 'batch'):
             return VideoDetailSerializer
         return VideoListSerializer
 
+    def get_queryset(self):
+        """Only load the columns and relations the ?fields= / ?omit= selection renders"""
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return super().get_queryset()
+        return Video.objects.with_api_fields(fields, extra_columns=self.ordering_fields)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+        return context
+
+    def get_sparse_fields(self):
+        """Serializer fields selected by ?fields= / ?omit= on list, detail and batch, None for all"""
+        if self.action not in ('list', 'retrieve', 'batch'):
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = get_sparse_fields(self.request.query_params, self.get_serializer_class())
+        return self._sparse_fields
+
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get random featured video for hero section"""
-        featured_video = Video.objects.filter(is_featured=True).order_by('?').first()
-        if featured_video:
-            serializer = VideoDetailSerializer(featured_video, context={'request': request})
-            return Response(serializer.data)
+        # Cached for every host, so links are finished per request
+        payload = get_random_featured_payload(
+            lambda video: VideoDetailSerializer(video, context={'deferred_media_urls': True}).data
+        )
+        if payload is not None:
+            return Response(finish_media_urls(payload, request))
         return Response({'detail': 'No featured video found'}, status=404)
 
     @action(detail=False, methods=['get'])
+    @catalog_conditional
+    @cached_catalog_response
+    def batch(self, request):
+        """
+        Get the details of several videos (?ids=3,1,2) in one request.
+        Results keep the requested order; unknown ids are listed in not_found.
+        """
+        ids = get_batch_ids(request.query_params)
+        videos = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer([videos[pk] for pk in ids if pk in videos], many=True)
+        return Response({
+            'results': serializer.data,
+            'not_found': [pk for pk in ids if pk not in videos]
+        })
+
+    @action(detail=False, methods=['get'])
+    @catalog_conditional
+    @cached_catalog_response
     def by_genre(self, request):
-        """Get videos grouped by genre"""
-        genres = Genre.objects.prefetch_related('videos').all()
-        result = {}
-        
-        for genre in genres:
-            videos = genre.videos.all()[:10]  # Limit to 10 videos per genre
-            if videos:
-                serializer = VideoListSerializer(videos, many=True, context={'request': request})
-                result[genre.name] = {
-                    'genre_id': genre.id,
-                    'genre_slug': genre.slug,
-                    'videos': serializer.data
-                }
+        """Get the newest videos grouped by genre"""
+        videos = Video.objects.top_per_genre(BY_GENRE_VIDEO_LIMIT).with_api_relations()
+        return Response(group_videos_by_genre(VideoListSerializer(videos, many=True, context={'request': request}).data))
+
+    @action(detail=True, methods=['get'])
+    def playback(self, request, pk=None):
+        """
+        Get URLs of all renditions plus duration and poster in one round trip.
+        Defaults to the adaptive master playlist when it exists.
+        """
+        manifest = get_playback_manifest(pk)
+        if manifest is None:
+            return Response({'detail': 'No Video matches the given query.'}, status=404)
         
-        return Response(result)
+        resolution = request.query_params.get('resolution', MASTER_PLAYLIST_RESOLUTION)
+        return Response(build_playback_response(manifest, resolution))
+
+    @action(detail=True, methods=['get'])
+    def processing(self, request, pk=None):
+        """Get the conversion status of every rendition, with live progress of running ones"""
+        video = get_object_or_404(Video.objects.only('id', 'duration'), pk=pk)
+        return Response(get_processing_status(video))
 
     @action(detail=True, methods=['get'])
     def stream_url(self, request, pk=None):
         """Get streaming URL for specific resolution"""
-        video = self.get_object()
         resolution = request.query_params.get('resolution', 'original')
+        manifest = get_playback_manifest(pk)
+        rendition = select_rendition(manifest, resolution) if manifest else None
         
-        video_url = video.get_video_url(resolution)
-        if video_url:
+        if rendition:
             return Response({
-                'video_url': video_url,
+                'video_url': sign_media_url(rendition['url']),
                 'resolution': resolution,
-                'available_resolutions': video.available_resolutions
+                'available_resolutions': sorted(r['resolution'] for r in manifest['renditions'])
             })
         
         return Response({'detail': 'Video not available in requested resolution'}, status=404)